@@ -1,72 +1,68 @@
-import pandas as pd
-from datetime import datetime
+import asyncio
 import numpy as np
-import time
-import os
+import sys
+from pathlib import Path
 
-def generate_s20_pressure_stream(output_path, run_duration_seconds=None):
-    PRESSURE_MIN, PRESSURE_MAX = 0, 1600  # bar
-    time_interval_sec = 30  # seconds between samples
+# Make the project root importable when this file is run directly as a script
+sys.path.append(str(Path(__file__).resolve().parents[3]))
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    if not os.path.exists(output_path):
-        with open(output_path, "w") as f:
-            f.write("timestamp,pressure_bar,event\n")
+from data_generators.base_sensor import SensorSpec, run_sensor_stream
 
-    row_count = 0
-    start_time = time.time()
+PRESSURE_MIN, PRESSURE_MAX = 0, 1600  # bar
+TIME_INTERVAL_SEC = 30  # seconds between samples
 
-    # Behavior parameters
-    ambient = 1.0              # bar
-    nominal = 40.0            # bar
-    ramp_time = 5 * 60        # ramp-up to nominal
-    stable_time = 10 * 60     # flat running
-    spike_time = 3 * 60       # pressure event (e.g. valve block)
-    cool_time = 7 * 60        # decay phase
-    total_cycle = ramp_time + stable_time + spike_time + cool_time
+# Behavior parameters
+AMBIENT = 1.0              # bar
+NOMINAL = 40.0            # bar
+RAMP_TIME = 5 * 60        # ramp-up to nominal
+STABLE_TIME = 10 * 60     # flat running
+SPIKE_TIME = 3 * 60       # pressure event (e.g. valve block)
+COOL_TIME = 7 * 60        # decay phase
+TOTAL_CYCLE = RAMP_TIME + STABLE_TIME + SPIKE_TIME + COOL_TIME
 
-    print(f"📡 Generating S-20 pressure data → {output_path} (Ctrl+C to stop)")
-
-    try:
-        while run_duration_seconds is None or (time.time() - start_time) < run_duration_seconds:
-            elapsed = (row_count * time_interval_sec) % total_cycle
-            event = 0
-
-            if elapsed < ramp_time:
-                # Linear ramp from ambient to nominal
-                pressure = ambient + (nominal - ambient) * (elapsed / ramp_time)
-
-            elif ramp_time <= elapsed < ramp_time + stable_time:
-                # Slight sinusoidal variation
-                t = elapsed - ramp_time
-                pressure = nominal + 1.0 * np.sin(2 * np.pi * t / 60)  # 1-min cycles
-
-            elif ramp_time + stable_time <= elapsed < ramp_time + stable_time + spike_time:
-                # Simulated overpressure event
-                t = elapsed - ramp_time - stable_time
-                pressure = 250 + 80 * np.sin(np.pi * t / spike_time)  # smooth sinusoidal bump
-                event = 1
-
-            else:
-                # Cooling decay
-                t = elapsed - ramp_time - stable_time - spike_time
-                pressure = 250 * np.exp(-0.05 * t)
+def build_pressure_cycle():
+    """The cycle is deterministic, so evaluate every sample slot once up front."""
+    elapsed_arr = np.arange(TOTAL_CYCLE // TIME_INTERVAL_SEC) * TIME_INTERVAL_SEC
+    in_ramp = elapsed_arr < RAMP_TIME
+    in_stable = ~in_ramp & (elapsed_arr < RAMP_TIME + STABLE_TIME)
+    in_spike = ~in_ramp & ~in_stable & (elapsed_arr < RAMP_TIME + STABLE_TIME + SPIKE_TIME)
+    pressure_arr = np.select(
+        [in_ramp, in_stable, in_spike],
+        [
+            # Linear ramp from ambient to nominal
+            AMBIENT + (NOMINAL - AMBIENT) * (elapsed_arr / RAMP_TIME),
+            # Slight sinusoidal variation, 1-min cycles
+            NOMINAL + 1.0 * np.sin(2 * np.pi * (elapsed_arr - RAMP_TIME) / 60),
+            # Simulated overpressure event: smooth sinusoidal bump
+            250 + 80 * np.sin(np.pi * (elapsed_arr - RAMP_TIME - STABLE_TIME) / SPIKE_TIME),
+        ],
+        # Cooling decay
+        250 * np.exp(-0.05 * (elapsed_arr - RAMP_TIME - STABLE_TIME - SPIKE_TIME)),
+    )
+    return np.clip(pressure_arr, PRESSURE_MIN, PRESSURE_MAX), in_spike.astype(int)
 
-            pressure = max(PRESSURE_MIN, min(pressure, PRESSURE_MAX))
+PRESSURE_CYCLE, EVENT_CYCLE = build_pressure_cycle()
 
-            timestamp = datetime.now().isoformat()
-            row = f"{timestamp},{round(pressure, 2)},{event}\n"
-            with open(output_path, "a") as f:
-                f.write(row)
+def compute_s20_pressure(first_row, n):
+    slots = (first_row + np.arange(n)) % len(EVENT_CYCLE)
+    return PRESSURE_CYCLE[slots].tolist(), EVENT_CYCLE[slots].tolist()
 
-            print(f"[{timestamp}] Pressure: {pressure:.2f} bar | Event: {event}")
-            row_count += 1
-            time.sleep(time_interval_sec)
+SPEC = SensorSpec(
+    name="S-20 pressure",
+    columns=["timestamp", "pressure_bar", "event"],
+    time_interval_sec=TIME_INTERVAL_SEC,
+    compute_fn=compute_s20_pressure,
+    row_format="{},{:.2f},{}\n",
+    status_format="[{1}] Pressure: {2:.2f} bar | Event: {3}",
+)
 
-    except KeyboardInterrupt:
-        print("⛔ S-20 pressure data generation stopped.")
+async def generate_s20_pressure_stream(output_path, run_duration_seconds=None, **options):
+    await run_sensor_stream(SPEC, output_path, run_duration_seconds, **options)
 
 if __name__ == "__main__":
-    generate_s20_pressure_stream(
-        r"D:\Project\industrial_iot_dashboard\data_output\ball_mill\s20_pressure_data.csv"
-    )
+    try:
+        asyncio.run(generate_s20_pressure_stream(
+            r"D:\Project\industrial_iot_dashboard\data_output\ball_mill\s20_pressure_data.csv"
+        ))
+    except KeyboardInterrupt:
+        pass
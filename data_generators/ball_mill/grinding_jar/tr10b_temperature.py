@@ -1,73 +1,66 @@
-import pandas as pd
+import asyncio
 import numpy as np
-from datetime import datetime
-import os
-import time
+import sys
+from pathlib import Path
 
-def generate_tr10b_temperature_stream(output_path, run_duration_seconds=None):
-    TEMP_MIN, TEMP_MAX = -196, 600  # °C, as per datasheet
-    time_interval_sec = 30  # seconds between rows
+# Make the project root importable when this file is run directly as a script
+sys.path.append(str(Path(__file__).resolve().parents[3]))
 
-    header = ["timestamp", "temperature_c", "event"]
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    if not os.path.exists(output_path):
-        with open(output_path, "w") as f:
-            f.write(",".join(header) + "\n")
+from data_generators.base_sensor import SensorSpec, run_sensor_stream
 
-    ambient_temp = 25.0  # °C
-    temp = ambient_temp
-    row_count = 0
-    start_time = time.time()
+TEMP_MIN, TEMP_MAX = -196, 600  # °C, as per datasheet
+TIME_INTERVAL_SEC = 30  # seconds between rows
 
-    # Simulation parameters
-    temp_rise_per_min = 5.0  # °C per minute
-    event_trigger_time = 15 * 60  # seconds: after 15 min
-    event_temp_spike = 80.0       # °C spike during event
-    event_duration = 5 * 60       # seconds (5 minutes)
-    post_event_cool_rate = 0.05   # °C/sec
+AMBIENT_TEMP = 25.0  # °C
 
-    print(f"Starting TR10-B temperature data generation to {output_path} (Ctrl+C to stop)")
+# Simulation parameters
+TEMP_RISE_PER_MIN = 5.0  # °C per minute
+EVENT_TRIGGER_TIME = 15 * 60  # seconds: after 15 min
+EVENT_TEMP_SPIKE = 80.0       # °C spike during event
+EVENT_DURATION = 5 * 60       # seconds (5 minutes)
+POST_EVENT_COOL_RATE = 0.05   # °C/sec
 
-    try:
-        while (run_duration_seconds is None) or (time.time() - start_time < run_duration_seconds):
-            elapsed = row_count * time_interval_sec
-            event = 0
+# Phase anchors
+RISE_PER_SEC = TEMP_RISE_PER_MIN / 60
+EVENT_END = EVENT_TRIGGER_TIME + EVENT_DURATION
+PRE_EVENT_FINAL_TEMP = AMBIENT_TEMP + RISE_PER_SEC * EVENT_TRIGGER_TIME
+POST_EVENT_PLATEAU = PRE_EVENT_FINAL_TEMP + EVENT_TEMP_SPIKE
 
-            # Normal heating phase
-            if elapsed < event_trigger_time:
-                temp = ambient_temp + (temp_rise_per_min / 60) * elapsed
-            # Event phase
-            elif event_trigger_time <= elapsed < event_trigger_time + event_duration:
-                base_temp = ambient_temp + (temp_rise_per_min / 60) * event_trigger_time
-                temp = base_temp + event_temp_spike
-                event = 1
-            # Cooling phase after event
-            else:
-                base_temp = ambient_temp + (temp_rise_per_min / 60) * event_trigger_time + event_temp_spike
-                temp = base_temp - post_event_cool_rate * (elapsed - event_trigger_time - event_duration)
+rng = np.random.default_rng()
 
-            # Add realistic sensor accuracy noise (± 0.1 + 0.0017*|t| for Class AA)
-            noise_std = 0.1 + 0.0017 * abs(temp)
-            temp += np.random.normal(0, noise_std)
+def compute_tr10b_temperature(first_row, n):
+    """Temperatures and event flags for rows first_row .. first_row + n - 1."""
+    elapsed = (first_row + np.arange(n)) * TIME_INTERVAL_SEC
+    in_event = (elapsed >= EVENT_TRIGGER_TIME) & (elapsed < EVENT_END)
+    temp = np.select(
+        # Normal heating phase, then the event plateau
+        [elapsed < EVENT_TRIGGER_TIME, in_event],
+        [AMBIENT_TEMP + RISE_PER_SEC * elapsed, POST_EVENT_PLATEAU],
+        # Cooling phase after event
+        POST_EVENT_PLATEAU - POST_EVENT_COOL_RATE * (elapsed - EVENT_END),
+    )
+    # Add realistic sensor accuracy noise (± 0.1 + 0.0017*|t| for Class AA)
+    temp += (0.1 + 0.0017 * np.abs(temp)) * rng.standard_normal(n)
+    # Clamp to sensor range
+    return np.clip(temp, TEMP_MIN, TEMP_MAX).tolist(), in_event.astype(int).tolist()
 
-            # Clamp to sensor range
-            temp = max(TEMP_MIN, min(temp, TEMP_MAX))
+SPEC = SensorSpec(
+    name="TR10-B temperature",
+    columns=["timestamp", "temperature_c", "event"],
+    time_interval_sec=TIME_INTERVAL_SEC,
+    compute_fn=compute_tr10b_temperature,
+    row_format="{},{:.2f},{}\n",
+    status_format="Wrote row {0}: Temp={2:.2f} °C, Event={3}",
+)
 
-            timestamp = datetime.now().isoformat()
-            new_row = pd.DataFrame([{
-                "timestamp": timestamp,
-                "temperature_c": round(temp, 2),
-                "event": event
-            }])
-            new_row.to_csv(output_path, mode='a', header=False, index=False)
-            print(f"Wrote row {row_count+1}: Temp={temp:.2f} °C, Event={event}")
-            row_count += 1
-            time.sleep(time_interval_sec)
-    except KeyboardInterrupt:
-        print("\nTR10-B data generation stopped by user.")
+async def generate_tr10b_temperature_stream(output_path, run_duration_seconds=None, **options):
+    await run_sensor_stream(SPEC, output_path, run_duration_seconds, **options)
 
 # For standalone testing
 if __name__ == "__main__":
-    generate_tr10b_temperature_stream(
-        r"D:\Project\industrial_iot_dashboard\data_output\ball_mill\tr10b_temperature.csv"
-    )
+    try:
+        asyncio.run(generate_tr10b_temperature_stream(
+            r"D:\Project\industrial_iot_dashboard\data_output\ball_mill\tr10b_temperature.csv"
+        ))
+    except KeyboardInterrupt:
+        pass
@@ -1,80 +1,82 @@
-import pandas as pd
-from datetime import datetime
-import os
-import time
-import math
+import asyncio
+import numpy as np
+import sys
+from pathlib import Path
 
-def generate_mill_shell_acoustic_data_stream(output_path, run_duration_seconds=None):
-    SOUND_MIN, SOUND_MAX = 50, 120      # dB
-    FILL_MIN, FILL_MAX = 40, 130        # %
-    time_interval_sec = 10              # 10 sec between samples
+# Make the project root importable when this file is run directly as a script
+sys.path.append(str(Path(__file__).resolve().parents[3]))
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    if not os.path.exists(output_path):
-        df_init = pd.DataFrame(columns=["timestamp", "sound_db", "fill_level_pct", "event"])
-        df_init.to_csv(output_path, index=False)
+from data_generators.base_sensor import SensorSpec, run_sensor_stream
 
-    row_count = 0
-    start_time = time.time()
+SOUND_MIN, SOUND_MAX = 50, 120      # dB
+FILL_MIN, FILL_MAX = 40, 130        # %
+TIME_INTERVAL_SEC = 10              # 10 sec between samples
 
-    # Process phases (seconds)
-    warmup = 4 * 60
-    stable = 6 * 60
-    event_start = 10 * 60
-    event_end = event_start + 2 * 60
-    cooldown = 15 * 60
-    cycle_duration = cooldown + 2 * 60
+# Process phases (seconds)
+WARMUP = 4 * 60
+STABLE = 6 * 60
+EVENT_START = 10 * 60
+EVENT_END = EVENT_START + 2 * 60
+COOLDOWN = 15 * 60
+CYCLE_DURATION = COOLDOWN + 2 * 60
+EVENT_PHASE = 2  # index of the event phase in build_acoustic_cycle()'s phase order
 
-    print(f"📡 Generating Mill Shell Acoustic data → {output_path} (Ctrl+C to stop)")
+def build_acoustic_cycle():
+    """The cycle is deterministic, so evaluate every sample slot once up front."""
+    elapsed_arr = np.arange(CYCLE_DURATION // TIME_INTERVAL_SEC) * TIME_INTERVAL_SEC
 
-    try:
-        while (run_duration_seconds is None) or (time.time() - start_time < run_duration_seconds):
-            elapsed = (row_count * time_interval_sec) % cycle_duration
-            event = 0
-
-            # ---- Phase Logic ----
-            if elapsed < warmup:
-                # Fill slowly ramps from 45% to 70%
-                fill_level = 45 + 25 * (elapsed / warmup)
-                sound_db = 68 + 2 * math.sin(2 * math.pi * elapsed / 90)
-            elif warmup <= elapsed < event_start:
-                # Stable grinding phase
-                t = elapsed - warmup
-                fill_level = 70 + 3 * math.sin(2 * math.pi * t / 120)
-                sound_db = 72 + 5 * math.sin(2 * math.pi * t / 90)
-            elif event_start <= elapsed < event_end:
-                # Event: surge in fill & sound
-                t = elapsed - event_start
-                fill_level = 100 + 20 * math.sin(math.pi * t / (event_end - event_start))
-                sound_db = 90 + 15 * math.sin(math.pi * t / (event_end - event_start))
-                event = 1
-            else:
-                # Cooldown and decay
-                t = elapsed - event_end
-                fill_level = 100 - 30 * (t / (cooldown - event_end))
-                sound_db = 75 - 10 * (t / (cooldown - event_end))
+    # Resolve each slot's phase once, then let that phase's handler fill in
+    # (fill level, sound level) for all of its slots
+    phase_ends = np.array([WARMUP, EVENT_START, EVENT_END])
+    phase = np.searchsorted(phase_ends, elapsed_arr, side="right")
+    event_span = EVENT_END - EVENT_START
+    cool_span = COOLDOWN - EVENT_END
+    phase_handlers = [
+        # Warm-up: fill slowly ramps from 45% to 70%
+        lambda e: (45 + 25 * (e / WARMUP),
+                   68 + 2 * np.sin(2 * np.pi * e / 90)),
+        # Stable grinding phase
+        lambda e: (70 + 3 * np.sin(2 * np.pi * (e - WARMUP) / 120),
+                   72 + 5 * np.sin(2 * np.pi * (e - WARMUP) / 90)),
+        # Event: surge in fill & sound
+        lambda e: (100 + 20 * np.sin(np.pi * (e - EVENT_START) / event_span),
+                   90 + 15 * np.sin(np.pi * (e - EVENT_START) / event_span)),
+        # Cooldown and decay
+        lambda e: (100 - 30 * ((e - EVENT_END) / cool_span),
+                   75 - 10 * ((e - EVENT_END) / cool_span)),
+    ]
+    fill_arr = np.empty(len(elapsed_arr))
+    sound_arr = np.empty(len(elapsed_arr))
+    for k, handler in enumerate(phase_handlers):
+        in_phase = phase == k
+        fill_arr[in_phase], sound_arr[in_phase] = handler(elapsed_arr[in_phase])
+    return (np.clip(sound_arr, SOUND_MIN, SOUND_MAX),
+            np.clip(fill_arr, FILL_MIN, FILL_MAX),
+            (phase == EVENT_PHASE).astype(int))
 
-            fill_level = max(FILL_MIN, min(fill_level, FILL_MAX))
-            sound_db = max(SOUND_MIN, min(sound_db, SOUND_MAX))
+SOUND_CYCLE, FILL_CYCLE, EVENT_CYCLE = build_acoustic_cycle()
 
-            timestamp = datetime.now().isoformat()
-            new_row = pd.DataFrame([{
-                "timestamp": timestamp,
-                "sound_db": round(sound_db, 2),
-                "fill_level_pct": round(fill_level, 1),
-                "event": event
-            }])
-            new_row.to_csv(output_path, mode='a', header=False, index=False)
+def compute_mill_shell_acoustic(first_row, n):
+    slots = (first_row + np.arange(n)) % len(EVENT_CYCLE)
+    return SOUND_CYCLE[slots].tolist(), FILL_CYCLE[slots].tolist(), EVENT_CYCLE[slots].tolist()
 
-            print(f"📝 Row {row_count+1}: Sound={sound_db:.2f} dB | Fill={fill_level:.1f}% | Event={event}")
-            row_count += 1
-            time.sleep(time_interval_sec)
+SPEC = SensorSpec(
+    name="Mill Shell acoustic",
+    columns=["timestamp", "sound_db", "fill_level_pct", "event"],
+    time_interval_sec=TIME_INTERVAL_SEC,
+    compute_fn=compute_mill_shell_acoustic,
+    row_format="{},{:.2f},{:.1f},{}\n",
+    status_format="📝 Row {0}: Sound={2:.2f} dB | Fill={3:.1f}% | Event={4}",
+)
 
-    except KeyboardInterrupt:
-        print("⛔ Acoustic data generation stopped.")
+async def generate_mill_shell_acoustic_data_stream(output_path, run_duration_seconds=None, **options):
+    await run_sensor_stream(SPEC, output_path, run_duration_seconds, **options)
 
 # For standalone testing (optional)
 if __name__ == "__main__":
-    generate_mill_shell_acoustic_data_stream(
-        r"D:\Project\industrial_iot_dashboard\data_output\ball_mill\mill_shell_acoustic_data.csv"
-    )
+    try:
+        asyncio.run(generate_mill_shell_acoustic_data_stream(
+            r"D:\Project\industrial_iot_dashboard\data_output\ball_mill\mill_shell_acoustic_data.csv"
+        ))
+    except KeyboardInterrupt:
+        pass
@@ -1,77 +1,72 @@
-import pandas as pd
-from datetime import datetime
-import os
-import time
-import math
-import random
+import asyncio
+import numpy as np
+import sys
+from pathlib import Path
 
-def generate_mill_shell_vibration_data_stream(output_path, run_duration_seconds=None):
-    # Sensor limits from datasheet
-    VIBRATION_MIN, VIBRATION_MAX = -50.0, 50.0   # g
-    TEMP_MIN, TEMP_MAX = 2.0, 121.0              # °C
-    time_interval_sec = 10                       # Interval between readings
+# Make the project root importable when this file is run directly as a script
+sys.path.append(str(Path(__file__).resolve().parents[3]))
 
-    header = ["timestamp", "vibration_g", "temperature_c"]
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    if not os.path.exists(output_path):
-        with open(output_path, "w") as f:
-            f.write(",".join(header) + "\n")
+from data_generators.base_sensor import SensorSpec, run_sensor_stream
 
-    row_count = 0
-    start_time = time.time()
+# Sensor limits from datasheet
+VIBRATION_MIN, VIBRATION_MAX = -50.0, 50.0   # g
+TEMP_MIN, TEMP_MAX = 2.0, 121.0              # °C
+TIME_INTERVAL_SEC = 10                       # Interval between readings
 
-    # Event simulation (e.g., fault or overload)
-    event_trigger_time = 5 * 60           # 5 minutes
-    event_duration = 2 * 60               # 2 minutes
-    event_vibration_spike = 15.0          # g, added on top
-    event_temp_spike = 15.0               # °C, added
+# Event simulation (e.g., fault or overload)
+EVENT_TRIGGER_TIME = 5 * 60           # 5 minutes
+EVENT_DURATION = 2 * 60               # 2 minutes
+EVENT_VIBRATION_SPIKE = 15.0          # g, added on top
+EVENT_TEMP_SPIKE = 15.0               # °C, added
+EVENT_END = EVENT_TRIGGER_TIME + EVENT_DURATION
 
-    print(f"Streaming Mill Shell Vibration Data to {output_path} (Press Ctrl+C to stop)\n")
+# elapsed advances in fixed steps, so the 2-minute vibration sine only
+# ever takes period / TIME_INTERVAL_SEC distinct values
+VIBRATION_PERIOD_SEC = 120
+VIBRATION_WAVE = 10.0 * np.sin(2 * np.pi * np.arange(VIBRATION_PERIOD_SEC // TIME_INTERVAL_SEC) * TIME_INTERVAL_SEC / VIBRATION_PERIOD_SEC)
 
-    try:
-        while run_duration_seconds is None or (time.time() - start_time < run_duration_seconds):
-            elapsed = row_count * time_interval_sec
+rng = np.random.default_rng()
 
-            # Periodic base vibration (simulate rotating machinery)
-            base_vibration = 10.0 * math.sin(2 * math.pi * (elapsed / 60) / 2) + random.uniform(-1, 1)
+def compute_mill_shell_vibration(first_row, n):
+    """Vibration and temperature for rows first_row .. first_row + n - 1."""
+    rows = first_row + np.arange(n)
+    elapsed = rows * TIME_INTERVAL_SEC
 
-            # Temperature baseline with slow rise
-            base_temperature = 30.0 + 0.01 * elapsed + random.uniform(-0.5, 0.5)
+    # Periodic base vibration (simulate rotating machinery)
+    vibration = VIBRATION_WAVE[rows % len(VIBRATION_WAVE)] + rng.uniform(-1, 1, n)
 
-            # During event: vibration + spike, temperature + spike
-            if event_trigger_time <= elapsed < event_trigger_time + event_duration:
-                vibration = base_vibration + event_vibration_spike
-                temperature = base_temperature + event_temp_spike
-            elif elapsed >= event_trigger_time + event_duration:
-                # Cooldown after event
-                vibration = base_vibration
-                temperature = base_temperature + event_temp_spike * math.exp(-0.01 * (elapsed - event_trigger_time - event_duration))
-            else:
-                vibration = base_vibration
-                temperature = base_temperature
+    # Temperature baseline with slow rise
+    temperature = 30.0 + 0.01 * elapsed + rng.uniform(-0.5, 0.5, n)
 
-            # Clamp to sensor limits
-            vibration = max(VIBRATION_MIN, min(vibration, VIBRATION_MAX))
-            temperature = max(TEMP_MIN, min(temperature, TEMP_MAX))
+    # During event: vibration + spike, temperature + spike
+    in_event = (elapsed >= EVENT_TRIGGER_TIME) & (elapsed < EVENT_END)
+    vibration[in_event] += EVENT_VIBRATION_SPIKE
+    temperature[in_event] += EVENT_TEMP_SPIKE
+    # Cooldown after event
+    after_event = elapsed >= EVENT_END
+    temperature[after_event] += EVENT_TEMP_SPIKE * np.exp(-0.01 * (elapsed[after_event] - EVENT_END))
 
-            # Write to CSV
-            timestamp = datetime.now().isoformat()
-            row = pd.DataFrame([{
-                "timestamp": timestamp,
-                "vibration_g": round(vibration, 3),
-                "temperature_c": round(temperature, 2)
-            }])
-            row.to_csv(output_path, mode='a', header=False, index=False)
+    # Clamp to sensor limits
+    return (np.clip(vibration, VIBRATION_MIN, VIBRATION_MAX).tolist(),
+            np.clip(temperature, TEMP_MIN, TEMP_MAX).tolist())
 
-            print(f"[{timestamp}] Vibration: {vibration:.3f}g | Temp: {temperature:.2f}°C")
-            row_count += 1
-            time.sleep(time_interval_sec)
+SPEC = SensorSpec(
+    name="Mill Shell vibration",
+    columns=["timestamp", "vibration_g", "temperature_c"],
+    time_interval_sec=TIME_INTERVAL_SEC,
+    compute_fn=compute_mill_shell_vibration,
+    row_format="{},{:.3f},{:.2f}\n",
+    status_format="[{1}] Vibration: {2:.3f}g | Temp: {3:.2f}°C",
+)
 
-    except KeyboardInterrupt:
-        print("\nStopped by user.")
+async def generate_mill_shell_vibration_data_stream(output_path, run_duration_seconds=None, **options):
+    await run_sensor_stream(SPEC, output_path, run_duration_seconds, **options)
 
 # Standalone run
 if __name__ == "__main__":
-    generate_mill_shell_vibration_data_stream(
-        r"D:\Project\industrial_iot_dashboard\data_output\ball_mill\mill_shell_vibration_data.csv"
-    )
+    try:
+        asyncio.run(generate_mill_shell_vibration_data_stream(
+            r"D:\Project\industrial_iot_dashboard\data_output\ball_mill\mill_shell_vibration_data.csv"
+        ))
+    except KeyboardInterrupt:
+        pass
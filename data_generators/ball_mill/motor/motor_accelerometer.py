@@ -1,99 +1,84 @@
-import pandas as pd
-from datetime import datetime
-import os
-import time
-import math
-
-def generate_motor_accelerometer_data_stream(output_path, run_duration_seconds=None):
-    ACCEL_MIN, ACCEL_MAX = -10.0, 10.0  # g
-    time_interval_sec = 10              # seconds between samples
-
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    if not os.path.exists(output_path):
-        df_init = pd.DataFrame(columns=["timestamp", "accel_x_g", "accel_y_g", "accel_z_g", "event"])
-        df_init.to_csv(output_path, index=False)
-
-    row_count = 0
-    start_time = time.time()
-
-    # Define realistic motor operation cycle
-    idle_duration = 3 * 60
-    ramp_up_duration = 2 * 60
-    steady_state_duration = 8 * 60
-    fault_duration = 2 * 60
-    shutdown_duration = 2 * 60
-    total_cycle = idle_duration + ramp_up_duration + steady_state_duration + fault_duration + shutdown_duration
-
-    print(f"📡 Generating motor accelerometer data → {output_path} (Ctrl+C to stop)")
-
-    try:
-        while run_duration_seconds is None or (time.time() - start_time < run_duration_seconds):
-            elapsed = (row_count * time_interval_sec) % total_cycle
-            event = 0
-
-            # Phase 1: Idle – low noise
-            if elapsed < idle_duration:
-                amp_x = 0.05
-                amp_y = 0.03
-                amp_z = 0.04
-
-            # Phase 2: Ramp-up
-            elif idle_duration <= elapsed < idle_duration + ramp_up_duration:
-                factor = (elapsed - idle_duration) / ramp_up_duration
-                amp_x = 0.1 + 1.5 * factor
-                amp_y = 0.1 + 1.0 * factor
-                amp_z = 0.1 + 0.8 * factor
-
-            # Phase 3: Steady operation
-            elif idle_duration + ramp_up_duration <= elapsed < idle_duration + ramp_up_duration + steady_state_duration:
-                amp_x = 2.0
-                amp_y = 1.5
-                amp_z = 1.2
-
-            # Phase 4: Fault (imbalance or bearing defect)
-            elif idle_duration + ramp_up_duration + steady_state_duration <= elapsed < idle_duration + ramp_up_duration + steady_state_duration + fault_duration:
-                amp_x = 6.0
-                amp_y = 5.0
-                amp_z = 4.5
-                event = 1
-
-            # Phase 5: Shutdown – decay
-            else:
-                t = elapsed - (idle_duration + ramp_up_duration + steady_state_duration + fault_duration)
-                decay = 1.0 - (t / shutdown_duration)
-                amp_x = 2.0 * decay
-                amp_y = 1.5 * decay
-                amp_z = 1.2 * decay
-
-            # Base sinusoidal signal
-            base_x = amp_x * math.sin(2 * math.pi * elapsed / 60)
-            base_y = amp_y * math.sin(2 * math.pi * elapsed / 90 + math.pi / 4)
-            base_z = amp_z * math.sin(2 * math.pi * elapsed / 120 + math.pi / 2)
-
-            # Clamp values
-            accel_x = max(ACCEL_MIN, min(base_x, ACCEL_MAX))
-            accel_y = max(ACCEL_MIN, min(base_y, ACCEL_MAX))
-            accel_z = max(ACCEL_MIN, min(base_z, ACCEL_MAX))
-
-            timestamp = datetime.now().isoformat()
-            new_row = pd.DataFrame([{
-                "timestamp": timestamp,
-                "accel_x_g": round(accel_x, 4),
-                "accel_y_g": round(accel_y, 4),
-                "accel_z_g": round(accel_z, 4),
-                "event": event
-            }])
-            new_row.to_csv(output_path, mode='a', header=False, index=False)
-
-            print(f"📝 Row {row_count+1}: X={accel_x:.4f}g, Y={accel_y:.4f}g, Z={accel_z:.4f}g | Event={event}")
-            row_count += 1
-            time.sleep(time_interval_sec)
-
-    except KeyboardInterrupt:
-        print("⛔ Motor Accelerometer generation stopped.")
+import asyncio
+import numpy as np
+import sys
+from pathlib import Path
+
+# Make the project root importable when this file is run directly as a script
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from data_generators.base_sensor import SensorSpec, run_sensor_stream
+
+ACCEL_MIN, ACCEL_MAX = -10.0, 10.0  # g
+TIME_INTERVAL_SEC = 10              # seconds between samples
+
+# Define realistic motor operation cycle
+IDLE_DURATION = 3 * 60
+RAMP_UP_DURATION = 2 * 60
+STEADY_STATE_DURATION = 8 * 60
+FAULT_DURATION = 2 * 60
+SHUTDOWN_DURATION = 2 * 60
+TOTAL_CYCLE = IDLE_DURATION + RAMP_UP_DURATION + STEADY_STATE_DURATION + FAULT_DURATION + SHUTDOWN_DURATION
+FAULT_PHASE = 3  # index of the fault phase in build_accelerometer_cycle()'s phase order
+
+def build_accelerometer_cycle():
+    """The cycle is deterministic, so evaluate every sample slot once up front."""
+    elapsed_arr = np.arange(TOTAL_CYCLE // TIME_INTERVAL_SEC) * TIME_INTERVAL_SEC
+    ramp_end = IDLE_DURATION + RAMP_UP_DURATION
+    steady_end = ramp_end + STEADY_STATE_DURATION
+    fault_end = steady_end + FAULT_DURATION
+
+    # Resolve each slot's phase once, then let that phase's handler fill in
+    # the (x, y, z) amplitudes for all of its slots
+    phase_ends = np.array([IDLE_DURATION, ramp_end, steady_end, fault_end])
+    phase = np.searchsorted(phase_ends, elapsed_arr, side="right")
+    phase_handlers = [
+        # Phase 1: Idle – low noise
+        lambda e: np.array([0.05, 0.03, 0.04]),
+        # Phase 2: Ramp-up
+        lambda e: 0.1 + np.outer((e - IDLE_DURATION) / RAMP_UP_DURATION, [1.5, 1.0, 0.8]),
+        # Phase 3: Steady operation
+        lambda e: np.array([2.0, 1.5, 1.2]),
+        # Phase 4: Fault (imbalance or bearing defect)
+        lambda e: np.array([6.0, 5.0, 4.5]),
+        # Phase 5: Shutdown – decay
+        lambda e: np.outer(1.0 - ((e - fault_end) / SHUTDOWN_DURATION), [2.0, 1.5, 1.2]),
+    ]
+    amp = np.empty((len(elapsed_arr), 3))
+    for k, handler in enumerate(phase_handlers):
+        in_phase = phase == k
+        amp[in_phase] = handler(elapsed_arr[in_phase])
+    amp_x, amp_y, amp_z = amp.T
+
+    # Base sinusoidal signal, clamped to the sensor range
+    return (np.clip(amp_x * np.sin(2 * np.pi * elapsed_arr / 60), ACCEL_MIN, ACCEL_MAX),
+            np.clip(amp_y * np.sin(2 * np.pi * elapsed_arr / 90 + np.pi / 4), ACCEL_MIN, ACCEL_MAX),
+            np.clip(amp_z * np.sin(2 * np.pi * elapsed_arr / 120 + np.pi / 2), ACCEL_MIN, ACCEL_MAX),
+            (phase == FAULT_PHASE).astype(int))
+
+ACCEL_X_CYCLE, ACCEL_Y_CYCLE, ACCEL_Z_CYCLE, EVENT_CYCLE = build_accelerometer_cycle()
+
+def compute_motor_accelerometer(first_row, n):
+    slots = (first_row + np.arange(n)) % len(EVENT_CYCLE)
+    return (ACCEL_X_CYCLE[slots].tolist(), ACCEL_Y_CYCLE[slots].tolist(),
+            ACCEL_Z_CYCLE[slots].tolist(), EVENT_CYCLE[slots].tolist())
+
+SPEC = SensorSpec(
+    name="Motor accelerometer",
+    columns=["timestamp", "accel_x_g", "accel_y_g", "accel_z_g", "event"],
+    time_interval_sec=TIME_INTERVAL_SEC,
+    compute_fn=compute_motor_accelerometer,
+    row_format="{},{:.4f},{:.4f},{:.4f},{}\n",
+    status_format="📝 Row {0}: X={2:.4f}g, Y={3:.4f}g, Z={4:.4f}g | Event={5}",
+)
+
+async def generate_motor_accelerometer_data_stream(output_path, run_duration_seconds=None, **options):
+    await run_sensor_stream(SPEC, output_path, run_duration_seconds, **options)
 
 # For standalone testing (optional)
 if __name__ == "__main__":
-    generate_motor_accelerometer_data_stream(
-        r"D:\Project\industrial_iot_dashboard\data_output\ball_mill\motor_accelerometer_data.csv"
-    )
+    try:
+        asyncio.run(generate_motor_accelerometer_data_stream(
+            r"D:\Project\industrial_iot_dashboard\data_output\ball_mill\motor_accelerometer_data.csv"
+        ))
+    except KeyboardInterrupt:
+        pass
@@ -1,66 +1,69 @@
-import pandas as pd
-from datetime import datetime
-import os
-import time
-import math
+import asyncio
+import numpy as np
+import sys
+from pathlib import Path
 
-def generate_motor_temperature_data_stream(output_path, run_duration_seconds=None):
-    # Sensor parameters (based on RTD/thermocouple specs)
-    TEMP_MIN, TEMP_MAX = -40, 150  # °C, typical for industrial motors
-    time_interval_sec = 10         # seconds between samples
+# Make the project root importable when this file is run directly as a script
+sys.path.append(str(Path(__file__).resolve().parents[3]))
 
-    # Ensure header row
-    header = ["timestamp", "temperature_c"]
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    if not os.path.exists(output_path):
-        with open(output_path, "w") as f:
-            f.write(",".join(header) + "\n")
+from data_generators.base_sensor import SensorSpec, run_sensor_stream
 
-    row_count = 0
-    start_time = time.time()
+# Sensor parameters (based on RTD/thermocouple specs)
+TEMP_MIN, TEMP_MAX = -40, 150  # °C, typical for industrial motors
+TIME_INTERVAL_SEC = 10         # seconds between samples
 
-    # Deterministic process parameters
-    # Normal operation: slow rise, with deterministic overheat event
-    event_trigger_time = 15 * 60      # seconds (event at 15 min)
-    event_duration = 2 * 60           # seconds (event lasts 2 min)
-    event_temp_spike = 40.0           # °C spike
+# Deterministic process parameters
+# Normal operation: slow rise, with deterministic overheat event
+EVENT_TRIGGER_TIME = 15 * 60      # seconds (event at 15 min)
+EVENT_DURATION = 2 * 60           # seconds (event lasts 2 min)
+EVENT_TEMP_SPIKE = 40.0           # °C spike
+EVENT_END = EVENT_TRIGGER_TIME + EVENT_DURATION
 
-    print(f"Starting deterministic Motor Temperature data generation to {output_path} (Ctrl+C to stop)")
+BASE_TEMP = 35.0       # °C at start
+RISE_PER_SEC = 0.03    # °C/sec slow rise
+# From this row on the base rise alone is past TEMP_MAX, so every later sample clips to it
+SATURATION_ROW = int(np.ceil((TEMP_MAX - BASE_TEMP) / RISE_PER_SEC / TIME_INTERVAL_SEC))
 
-    try:
-        while (run_duration_seconds is None) or (time.time() - start_time < run_duration_seconds):
-            elapsed = row_count * time_interval_sec
+def build_temperature_schedule():
+    """The timeline is deterministic and flat once saturated, so evaluate it once up to SATURATION_ROW."""
+    elapsed = np.arange(SATURATION_ROW + 1) * TIME_INTERVAL_SEC
 
-            # Base temperature: ambient + slow rise
-            base_temp = 35 + 0.03 * elapsed  # e.g., 35°C start, rises 0.03°C/sec
+    # Base temperature: ambient + slow rise
+    temperature = BASE_TEMP + RISE_PER_SEC * elapsed
 
-            # Event: overheat
-            if event_trigger_time <= elapsed < event_trigger_time + event_duration:
-                temperature = base_temp + event_temp_spike
-            elif elapsed >= event_trigger_time + event_duration:
-                # After event: plateau or slow cool
-                temperature = max(base_temp + event_temp_spike - 0.01 * (elapsed - event_trigger_time - event_duration), base_temp)
-            else:
-                temperature = base_temp
+    # Event: overheat
+    in_event = (elapsed >= EVENT_TRIGGER_TIME) & (elapsed < EVENT_END)
+    temperature[in_event] += EVENT_TEMP_SPIKE
+    # After event: plateau or slow cool
+    after_event = elapsed >= EVENT_END
+    temperature[after_event] += np.maximum(EVENT_TEMP_SPIKE - 0.01 * (elapsed[after_event] - EVENT_END), 0)
 
-            temperature = max(TEMP_MIN, min(temperature, TEMP_MAX))
+    return np.clip(temperature, TEMP_MIN, TEMP_MAX)
 
-            timestamp = datetime.now().isoformat()
-            new_row = pd.DataFrame([{
-                "timestamp": timestamp,
-                "temperature_c": round(temperature, 2)
-            }])
-            new_row.to_csv(output_path, mode='a', header=False, index=False)
+TEMPERATURE_SCHEDULE = build_temperature_schedule()
 
-            print(f"Wrote row {row_count+1}: Temperature={temperature:.2f}C")
-            row_count += 1
-            time.sleep(time_interval_sec)
+def compute_motor_temperature(first_row, n):
+    """Temperatures for rows first_row .. first_row + n - 1."""
+    rows = np.minimum(first_row + np.arange(n), SATURATION_ROW)
+    return (TEMPERATURE_SCHEDULE[rows].tolist(),)
 
-    except KeyboardInterrupt:
-        print("\nMotor Temperature data generation stopped by user.")
+SPEC = SensorSpec(
+    name="Motor temperature",
+    columns=["timestamp", "temperature_c"],
+    time_interval_sec=TIME_INTERVAL_SEC,
+    compute_fn=compute_motor_temperature,
+    row_format="{},{:.2f}\n",
+    status_format="Wrote row {0}: Temperature={2:.2f}C",
+)
+
+async def generate_motor_temperature_data_stream(output_path, run_duration_seconds=None, **options):
+    await run_sensor_stream(SPEC, output_path, run_duration_seconds, **options)
 
 # For standalone testing (optional)
 if __name__ == "__main__":
-    generate_motor_temperature_data_stream(
-        r"D:\Project\industrial_iot_dashboard\data_output\ball_mill\motor_temperature_data.csv"
-    )
+    try:
+        asyncio.run(generate_motor_temperature_data_stream(
+            r"D:\Project\industrial_iot_dashboard\data_output\ball_mill\motor_temperature_data.csv"
+        ))
+    except KeyboardInterrupt:
+        pass
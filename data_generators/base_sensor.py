@@ -1 +1,54 @@
- 
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from data_generators.utils.simulation_utils import DeadlineScheduler, iso_timestamp, open_stream_writer, run_deadline
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+LOG_EVERY = 60  # rows between status log lines
+
+
+@dataclass
+class SensorSpec:
+    """Everything run_sensor_stream() needs to know about one simulated sensor stream."""
+    name: str                # used in log lines
+    columns: list            # CSV header, timestamp first
+    time_interval_sec: float
+    compute_fn: Callable     # compute_fn(first_row, n) -> one list per value column, rows first_row .. first_row + n - 1
+    row_format: str          # str.format template for one CSV line, timestamp first
+    status_format: str       # status log line, formatted with (row number, timestamp, *values)
+    block_size: int = 256    # rows computed per compute_fn call
+
+
+async def run_sensor_stream(spec, output_path, run_duration_seconds=None, batch_size=32, rotate_seconds=None, writer_backend="csv"):
+    """Stream `spec` to `output_path` in real time: compute rows in blocks, timestamp, write and pace them."""
+    row_count = 0
+    deadline = run_deadline(run_duration_seconds)
+    block_size = spec.block_size
+
+    logger.info(f"📡 Generating {spec.name} data → {output_path} (Ctrl+C to stop)")
+
+    scheduler = DeadlineScheduler(spec.time_interval_sec)
+    try:
+        with open_stream_writer(output_path, spec.columns, spec.row_format, batch_size, rotate_seconds, writer_backend) as writer:
+            while time.monotonic() < deadline:
+                block_slot = row_count % block_size
+                if block_slot == 0:
+                    block = list(zip(*spec.compute_fn(row_count, block_size)))
+                values = block[block_slot]
+
+                timestamp = iso_timestamp()
+                writer.write(timestamp, *values)
+
+                if row_count % LOG_EVERY == 0:
+                    logger.info(spec.status_format.format(row_count + 1, timestamp, *values))
+                row_count += 1
+                await scheduler.wait_async()
+
+    except asyncio.CancelledError:
+        logger.info(f"⛔ {spec.name} data generation stopped.")
+        raise
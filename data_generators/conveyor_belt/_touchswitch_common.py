@@ -0,0 +1,92 @@
+import asyncio
+import time
+import logging
+import numpy as np
+from pathlib import Path
+
+from data_generators.utils.simulation_utils import DeadlineScheduler, iso_timestamp, run_deadline, sync_file
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+COLUMNS = [
+    "timestamp", "sensor_id", "alignment_status",
+    "relay_status", "led_status", "thermal_fuse_blown",
+    "alerts", "measured_force", "operational_mode"
+]
+ROW_FORMAT = "{},{},{},{},{},{},{},{:.2f},{}\n"
+
+PRODUCTION_HOURS = (6, 22)
+THERMAL_ALARM_TICKS = 5 * 60  # 5 minutes of samples at 1 Hz
+
+
+async def run_touchswitch(force_fn, output_path, sensor_id, run_duration_seconds=None, batch_size=32, name="Touchswitch"):
+    """Stream touchswitch samples whose measured force comes from `force_fn(rng, t, operational_mode)`.
+
+    Rows are written `batch_size` at a time (flushed per batch, fsync'd on exit).
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    file_exists = output_path.exists() and output_path.stat().st_size > 0
+
+    logger.info(f"{name} simulation writing to {output_path}")
+
+    thermal_fuse_blown = False
+    alarm_ticks = 0  # consecutive misaligned samples
+    shift_start, shift_end = PRODUCTION_HOURS
+
+    rng = np.random.default_rng()
+    row_format = ROW_FORMAT.format
+    t = 0
+    dt = 1  # 1 second interval
+
+    with open(output_path, 'ab', buffering=1 << 20) as csvfile:
+        if not file_exists:
+            csvfile.write((",".join(COLUMNS) + "\n").encode("ascii"))
+        batch = []
+        deadline = run_deadline(run_duration_seconds)
+        scheduler = DeadlineScheduler(dt, max_behind=5)
+        try:
+            while time.monotonic() < deadline:
+                now = time.time()
+                hour = time.localtime(now).tm_hour
+                operational_mode = 1 if shift_start <= hour <= shift_end else 0
+
+                force = force_fn(rng, t, operational_mode)
+
+                # The fuse blows once the misalignment has lasted the threshold, i.e. on its (threshold + 1)th sample
+                alignment_status = 1 if force >= 8.0 else 0
+                alarm_ticks = (alarm_ticks + 1) * alignment_status
+                thermal_fuse_blown = thermal_fuse_blown or alarm_ticks > THERMAL_ALARM_TICKS
+
+                # Alerts and indicators
+                if thermal_fuse_blown:
+                    relay_status = 0
+                    led_status = 0
+                    alerts = "THERMAL FUSE BLOWN"
+                elif alignment_status == 1:
+                    relay_status = 0
+                    led_status = 0
+                    alerts = "MISALIGNMENT"
+                else:
+                    relay_status = 1
+                    led_status = 1
+                    alerts = "NORMAL"
+
+                batch.append(row_format(
+                    iso_timestamp(now), sensor_id, alignment_status, relay_status, led_status,
+                    int(thermal_fuse_blown), alerts, force, operational_mode
+                ))
+                if len(batch) >= batch_size:
+                    csvfile.write("".join(batch).encode("ascii"))
+                    batch.clear()
+                    csvfile.flush()
+
+                t += dt
+                await scheduler.wait_async()
+        except asyncio.CancelledError:
+            logger.info(f"{name} simulation stopped")
+            raise
+        finally:
+            csvfile.write("".join(batch).encode("ascii"))
+            sync_file(csvfile)
@@ -1,28 +1,41 @@
+import asyncio
+import heapq
 import numpy as np
-import pandas as pd
-from datetime import datetime, timedelta
+import random
 import time
 import csv
 import logging
 from pathlib import Path
+import sys
+
+# Make the project root importable when this file is run directly as a script
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from data_generators.utils.simulation_utils import DeadlineScheduler, clamp, make_timestamp_formatter, run_deadline, sync_file
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# "%Y-%m-%d %H:%M:%S.mmm", the format this sensor's CSV has always used
+heat_timestamp = make_timestamp_formatter("%Y-%m-%d %H:%M:%S", 3)
+
 
-def generate_realistic_heat_data(
+async def generate_realistic_heat_data(
         output_file_path,
         sensor_id: str = "PATOL5450",
         time_interval_seconds: float = 1.0,
         fire_alarm_threshold: float = 100.0,  # CORRECTED: From datasheet 100°C minimum
         run_duration_seconds: int = None,
-        daily_cycle: bool = True
+        daily_cycle: bool = True,
+        flush_every: int = 64
 ):
     """
     Generates realistic heat sensor data with thermal patterns.
     All datasheet specifications preserved exactly as per PATOL 5450 datasheet.
     CORRECTED: Fire alarm threshold set to 100°C as per datasheet.
     Runs infinitely if run_duration_seconds is None.
+    Rows are buffered and flushed + fsync'd every `flush_every` rows (in a worker thread, so the
+    shared event loop never waits on the disk) and on exit.
     """
 
     equipment_schedule = {
@@ -36,8 +49,6 @@ def generate_realistic_heat_data(
     else:
         logger.info(f"Sensor [{sensor_id}]: Running infinitely until stopped")
 
-    sim_start_time = datetime.now()
-
     # Hot spot scenarios with realistic probabilities
     hot_spot_scenarios = {
         "friction_buildup": {"probability": 0.001, "temp_range": (100, 120), "duration_minutes": 30},
@@ -45,13 +56,17 @@ def generate_realistic_heat_data(
         "material_jam": {"probability": 0.002, "temp_range": (100, 110), "duration_minutes": 15}
     }
 
+    # (expiry on the time.monotonic() clock, temp) heap: the next spot to expire is always first
     active_hot_spots = []
 
+    # Natural daily temperature variation, one entry per hour of the day
+    daily_variation_by_hour = (8 * np.sin(2 * np.pi * (np.arange(24) - 6) / 24)).tolist()
+
     output_file_path = Path(output_file_path)
     output_file_path.parent.mkdir(parents=True, exist_ok=True)
     file_exists = output_file_path.exists() and output_file_path.stat().st_size > 0
 
-    with open(output_file_path, 'a', newline='', encoding='utf-8') as csvfile:
+    with open(output_file_path, 'a', newline='', encoding='utf-8', buffering=1 << 20) as csvfile:
         csv_writer = csv.writer(csvfile)
 
         if not file_exists:
@@ -62,68 +77,64 @@ def generate_realistic_heat_data(
             ])
 
         i = 0
+        last_hour = None
+        scheduler = DeadlineScheduler(time_interval_seconds, max_behind=5)
+        deadline = run_deadline(run_duration_seconds)
         try:
             while True:
-                # Check duration only if specified
-                if run_duration_seconds and (datetime.now() - sim_start_time).total_seconds() > run_duration_seconds:
+                if time.monotonic() >= deadline:
                     break
 
-                now = datetime.now()
-                timestamp = now.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-                current_hour = now.hour
+                now = time.time()
+                now_mono = time.monotonic()
+                timestamp = heat_timestamp(now)
+                current_hour = time.localtime(now).tm_hour
 
-                # Base temperature with daily cycle (within datasheet operating range -20°C to +70°C)
-                base_temp = 25.0
-                if daily_cycle:
-                    # Natural daily temperature variation
-                    daily_variation = 8 * np.sin(2 * np.pi * (current_hour - 6) / 24)
-                    base_temp += daily_variation
+                # Base and equipment heat only change on the hour, so recompute them then
+                if current_hour != last_hour:
+                    last_hour = current_hour
+                    # Base temperature with daily cycle (within datasheet operating range -20°C to +70°C)
+                    base_temp = 25.0
+                    if daily_cycle:
+                        base_temp += daily_variation_by_hour[current_hour]
 
-                # Equipment heat based on schedule
-                equipment_heat = 0
-                is_maintenance = current_hour in equipment_schedule["maintenance_hours"]
+                    # Equipment heat based on schedule
+                    equipment_heat = 0
+                    is_maintenance = current_hour in equipment_schedule["maintenance_hours"]
 
-                if not is_maintenance and current_hour < equipment_schedule["motor_runtime_hours"]:
-                    # Equipment running - gradual heat buildup
-                    hours_running = current_hour if current_hour <= 12 else 24 - current_hour
-                    equipment_heat = min(15, hours_running * 2)  # Max 15°C increase
+                    if not is_maintenance and current_hour < equipment_schedule["motor_runtime_hours"]:
+                        # Equipment running - gradual heat buildup
+                        hours_running = current_hour if current_hour <= 12 else 24 - current_hour
+                        equipment_heat = min(15, hours_running * 2)  # Max 15°C increase
 
                 # Check for hot spot scenarios
                 hot_spot_temp = 0
 
-                active_hot_spots = [
-                    spot for spot in active_hot_spots
-                    if (now - datetime.strptime(spot["start_time"], "%Y-%m-%d %H:%M:%S.%f")).total_seconds() < spot[
-                        "duration"] * 60
-                ]
+                while active_hot_spots and active_hot_spots[0][0] <= now_mono:
+                    heapq.heappop(active_hot_spots)
 
                 # Generate new hot spots
                 for scenario_name, scenario_config in hot_spot_scenarios.items():
-                    if np.random.random() < scenario_config["probability"]:
-                        hot_spot = {
-                            "type": scenario_name,
-                            "start_time": timestamp,
-                            "duration": scenario_config["duration_minutes"],
-                            "temp": np.random.uniform(*scenario_config["temp_range"])
-                        }
-                        active_hot_spots.append(hot_spot)
+                    if random.random() < scenario_config["probability"]:
+                        expiry = now_mono + scenario_config["duration_minutes"] * 60
+                        heapq.heappush(active_hot_spots, (expiry, random.uniform(*scenario_config["temp_range"])))
                         logger.warning(f"Sensor [{sensor_id}]: Hot spot scenario '{scenario_name}' initiated")
 
                 # Apply active hot spots
                 if active_hot_spots:
-                    hottest_spot = max(active_hot_spots, key=lambda x: x["temp"])
-                    hot_spot_temp = hottest_spot["temp"] - base_temp - equipment_heat
+                    hottest_temp = max(temp for _, temp in active_hot_spots)
+                    hot_spot_temp = hottest_temp - base_temp - equipment_heat
 
                 # Calculate final temperature
                 current_material_temp = base_temp + equipment_heat + hot_spot_temp
-                current_material_temp += np.random.normal(0, 0.5)  # Small measurement noise
+                current_material_temp += random.gauss(0, 0.5)  # Small measurement noise
 
                 # Ensure temperature stays within sensor detection range (80-1000°C from datasheet)
-                current_material_temp = np.clip(current_material_temp, 15, 1000)
+                current_material_temp = clamp(15, current_material_temp, 1000)
 
                 # CORRECTED alarm logic using verified datasheet threshold (100°C)
                 fire_alarm_state = 1 if current_material_temp >= fire_alarm_threshold else 0
-                fault_state = 1 if np.random.random() < 0.0001 else 0  # Very rare faults
+                fault_state = 1 if random.random() < 0.0001 else 0  # Very rare faults
 
                 # VERIFIED LED logic from datasheet
                 if fault_state:
@@ -139,7 +150,7 @@ def generate_realistic_heat_data(
                 csv_writer.writerow([
                     timestamp,
                     sensor_id,
-                    round(current_material_temp, 2),
+                    f"{current_material_temp:.2f}",
                     fire_alarm_state,
                     fault_state,
                     green_led_normal,
@@ -147,15 +158,18 @@ def generate_realistic_heat_data(
                 ])
 
                 i += 1
+                if i % flush_every == 0:
+                    await asyncio.to_thread(sync_file, csvfile)
                 if i % 300 == 0:  # Log every 5 minutes (300 seconds)
-                    logger.debug(f"Sensor [{sensor_id}]: Generated {i} points. Temp: {current_material_temp:.1f}°C")
+                    logger.debug("Sensor [%s]: Generated %d points. Temp: %.1f°C", sensor_id, i, current_material_temp)
 
-                time.sleep(time_interval_seconds)
+                await scheduler.wait_async()
 
-        except KeyboardInterrupt:
+        except asyncio.CancelledError:
             logger.info(f"Sensor [{sensor_id}]: Stopped by user interrupt")
-        except Exception as e:
-            logger.error(f"Sensor [{sensor_id}]: Error occurred: {e}")
+            raise
+        finally:
+            sync_file(csvfile)
 
     logger.info(f"Sensor [{sensor_id}]: Completed. Generated {i} data points.")
 
@@ -163,4 +177,7 @@ def generate_realistic_heat_data(
 if __name__ == "__main__":
     # Run heat sensor infinitely
     output_path = "../../data_output/conveyor_belt/heat_PATOL5450-CB1-HOTSPOT_data.csv"
-    generate_realistic_heat_data(output_path, run_duration_seconds=None)
+    try:
+        asyncio.run(generate_realistic_heat_data(output_path, run_duration_seconds=None))
+    except KeyboardInterrupt:
+        pass
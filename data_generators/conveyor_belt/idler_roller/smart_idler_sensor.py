@@ -1,14 +1,23 @@
+import asyncio
 import numpy as np
 import time
 import csv
 import logging
-from datetime import datetime
 from pathlib import Path
+import sys
+
+# Make the project root importable when this file is run directly as a script
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from data_generators.utils.simulation_utils import DeadlineScheduler, iso_timestamp, run_deadline, sync_file
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class SmartIdlerSimulator:
+    # Order of the vibration values in compute_block() rows
+    VIBRATION_FIELDS = ('rms', 'BPFI', 'BPFO', 'BSF', 'FTF')
+
     def __init__(self, sensor_id="SI-OFBA-6309-45-40-03"):
         self.sensor_id = sensor_id
         self.sampling_interval = 0.1  # 10 Hz for summary data (vibration sampled at 1399 Hz internally)
@@ -31,97 +40,130 @@ class SmartIdlerSimulator:
                 'rpm_deviation': 15  # %
             }
         }
+        self._rng = np.random.default_rng()
+        # Per-field uniform ranges, in VIBRATION_FIELDS order
+        self._vib_lo = np.array([0.1, 0.01, 0.01, 0.01, 0.01])
+        self._vib_hi = np.array([0.5, 0.1, 0.1, 0.1, 0.1])
+
+    # Alert names, in the order compute_block() evaluates them
+    ALERT_NAMES = ('TEMP_LEFT_HIGH', 'TEMP_RIGHT_HIGH', 'VIBRATION_HIGH', 'RPM_DEVIATION')
+    BLOCK_SIZE = 600  # ticks computed per compute_block() call (1 min at 10 Hz)
 
-    def calculate_rpm(self, belt_speed_mps=0.5, idler_diameter_mm=159):
-        """Calculate RPM based on belt speed and idler diameter"""
+    def expected_rpm(self, belt_speed_mps=0.5, idler_diameter_mm=159):
+        """Nominal RPM for the belt speed and idler diameter"""
         circumference = np.pi * idler_diameter_mm / 1000  # meters
-        expected_rpm = (belt_speed_mps * 60) / circumference
-        actual_rpm = expected_rpm * np.random.uniform(0.95, 1.05)
-        return np.clip(actual_rpm, *self.operational_limits['rpm_range']), expected_rpm
-
-    def generate_vibration_data(self, rpm, defect_type=None):
-        """Simulate vibration spectra with potential defects"""
-        base_vibration = {
-            'rms': np.random.uniform(0.1, 0.5),
-            'BPFI': np.random.uniform(0.01, 0.1),
-            'BPFO': np.random.uniform(0.01, 0.1),
-            'BSF': np.random.uniform(0.01, 0.1),
-            'FTF': np.random.uniform(0.01, 0.1)
-        }
-        # Simulate defects
-        if defect_type in self.bearing_defects and self.bearing_defects[defect_type]:
-            base_vibration[defect_type] *= np.random.uniform(5, 10)
-            base_vibration['rms'] = np.clip(base_vibration['rms'] * 3, *self.operational_limits['vibration_mode1_range'])
-        return base_vibration
-
-    def check_alerts(self, temp_left, temp_right, vibration_rms, actual_rpm, expected_rpm):
-        """Generate alerts based on datasheet thresholds"""
-        alerts = []
-        # Temperature alerts
-        if temp_left > self.operational_limits['alert_thresholds']['temp']:
-            alerts.append("TEMP_LEFT_HIGH")
-        if temp_right > self.operational_limits['alert_thresholds']['temp']:
-            alerts.append("TEMP_RIGHT_HIGH")
-        # Vibration alerts
-        if vibration_rms > self.operational_limits['alert_thresholds']['vibration_rms']:
-            alerts.append("VIBRATION_HIGH")
-        # RPM deviation
-        rpm_deviation = abs((actual_rpm - expected_rpm)/expected_rpm)*100
-        if rpm_deviation > self.operational_limits['alert_thresholds']['rpm_deviation']:
-            alerts.append("RPM_DEVIATION")
-        return alerts
-
-    def generate_data(self, output_path, duration_hours=None):
+        return (belt_speed_mps * 60) / circumference
+
+    def alert_thresholds(self):
+        """(temp, vibration_rms, rpm_deviation) alert thresholds, unpacked once for compute_block()"""
+        thresholds = self.operational_limits['alert_thresholds']
+        return thresholds['temp'], thresholds['vibration_rms'], thresholds['rpm_deviation']
+
+    def simulate_defect(self):
+        """Simulate a new defect every hour; returns True when one starts"""
+        if time.time() - self.last_defect_time > 3600:
+            defect = self._rng.choice(list(self.bearing_defects.keys())+[None], p=[0.02,0.02,0.02,0.02,0.92])
+            if defect:
+                self.bearing_defects[defect] = True
+                self.last_defect_time = time.time()
+                logger.warning(f"Simulating {defect} defect on {self.sensor_id}")
+                return True
+        return False
+
+    def compute_block(self, n, thresholds=None):
+        """Simulate the next n ticks at once: one NumPy call per quantity instead of per tick.
+
+        Returns a list of (rotation_count, rpm, temp_left, temp_right, *VIBRATION_FIELDS, alerts) rows.
+        Defects active when the block is computed apply to the whole block.
+        """
+        rng = self._rng
+        temp_thr, vib_thr, rpm_thr = thresholds or self.alert_thresholds()
+        tmin, tmax = self.operational_limits['temp_range']
+        expected_rpm = self.expected_rpm()
+
+        actual_rpm = np.clip(expected_rpm * rng.uniform(0.95, 1.05, n), *self.operational_limits['rpm_range'])
+        rotation_count = self.rotation_count + np.cumsum((actual_rpm * self.sampling_interval / 60).astype(int))
+        # Simulate temperatures (left/right bearings)
+        rpm_heating = (actual_rpm - 350) * 0.01
+        temp_left = np.clip(rng.normal(35, 2, n) + rpm_heating, tmin, tmax)
+        temp_right = np.clip(rng.normal(35, 2, n) + rpm_heating, tmin, tmax)
+        # Simulate vibration spectra, each tick exciting one of the active defects
+        vibration = rng.uniform(self._vib_lo, self._vib_hi, (n, len(self.VIBRATION_FIELDS)))
+        active = [self.VIBRATION_FIELDS.index(k) for k, v in self.bearing_defects.items() if v]
+        if active:
+            vibration[np.arange(n), rng.choice(active, n)] *= rng.uniform(5, 10, n)
+            vibration[:, 0] = np.clip(vibration[:, 0] * 3, *self.operational_limits['vibration_mode1_range'])
+        # Alerts based on datasheet thresholds
+        flags = zip(
+            (temp_left > temp_thr).tolist(),
+            (temp_right > temp_thr).tolist(),
+            (vibration[:, 0] > vib_thr).tolist(),
+            (np.abs((actual_rpm - expected_rpm) / expected_rpm) * 100 > rpm_thr).tolist(),
+        )
+        names = self.ALERT_NAMES
+        alerts = [";".join([name for name, hit in zip(names, tick) if hit]) or "NORMAL" for tick in flags]
+
+        self.rotation_count = int(rotation_count[-1])
+        return list(zip(
+            rotation_count.tolist(), actual_rpm.tolist(), temp_left.tolist(), temp_right.tolist(),
+            *vibration.T.tolist(), alerts,
+        ))
+
+    async def generate_data(self, output_path, duration_hours=None, flush_every=64):
+        """Stream samples to `output_path`, flushing + fsync'ing every `flush_every` rows (off the event loop) and on exit"""
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         logger.info(f"Writing Smart-Idler data to: {output_path.resolve()}")
-        with open(output_path, 'w', newline='') as csvfile:
+        with open(output_path, 'w', newline='', buffering=1 << 20) as csvfile:
             writer = csv.writer(csvfile)
             writer.writerow([
                 "timestamp", "sensor_id", "rotation_count", "rpm",
                 "temp_left", "temp_right", "vibration_rms",
                 "BPFI", "BPFO", "BSF", "FTF", "alerts"
             ])
-            start_time = time.time()
-            while True:
-                if duration_hours and (time.time() - start_time) > duration_hours*3600:
-                    break
-                timestamp = datetime.now().isoformat()
-                actual_rpm, expected_rpm = self.calculate_rpm()
-                self.rotation_count += int(actual_rpm * self.sampling_interval / 60)
-                # Simulate temperatures (left/right bearings)
-                temp_left = np.random.normal(35, 2)
-                temp_right = np.random.normal(35, 2)
-                temp_left += (actual_rpm - 350) * 0.01
-                temp_right += (actual_rpm - 350) * 0.01
-                temp_left = np.clip(temp_left, *self.operational_limits['temp_range'])
-                temp_right = np.clip(temp_right, *self.operational_limits['temp_range'])
-                # Simulate vibration, possibly with a defect
-                defect_type = None
-                if any(self.bearing_defects.values()):
-                    defect_type = np.random.choice([k for k, v in self.bearing_defects.items() if v])
-                vibration = self.generate_vibration_data(actual_rpm, defect_type)
-                # Check for alerts
-                alerts = self.check_alerts(temp_left, temp_right, vibration['rms'], actual_rpm, expected_rpm)
-                writer.writerow([
-                    timestamp, self.sensor_id, self.rotation_count,
-                    round(actual_rpm, 1),
-                    round(temp_left, 1), round(temp_right, 1),
-                    round(vibration['rms'], 4),
-                    round(vibration['BPFI'], 4),
-                    round(vibration['BPFO'], 4),
-                    round(vibration['BSF'], 4),
-                    round(vibration['FTF'], 4),
-                    ";".join(alerts) if alerts else "NORMAL"
-                ])
-                # Simulate a new defect every hour
-                if time.time() - self.last_defect_time > 3600:
-                    defect = np.random.choice(list(self.bearing_defects.keys())+[None], p=[0.02,0.02,0.02,0.02,0.92])
-                    if defect:
-                        self.bearing_defects[defect] = True
-                        self.last_defect_time = time.time()
-                        logger.warning(f"Simulating {defect} defect on {self.sensor_id}")
-                time.sleep(self.sampling_interval)
+            # Loop-invariant limits and bound methods
+            thresholds = self.alert_thresholds()
+            sampling_interval = self.sampling_interval
+            sensor_id = self.sensor_id
+            block_size = self.BLOCK_SIZE
+            compute_block = self.compute_block
+            writerow = writer.writerow
+
+            deadline = run_deadline(duration_hours and duration_hours * 3600)
+            scheduler = DeadlineScheduler(sampling_interval, max_behind=5)
+            tick = 0
+            block_slot = block_size
+            rotation_count = self.rotation_count
+            try:
+                while True:
+                    if time.monotonic() >= deadline:
+                        break
+                    # A defect is still attempted every tick; a new one restarts the block after the last written row
+                    if self.simulate_defect():
+                        self.rotation_count = rotation_count
+                        block_slot = block_size
+                    if block_slot >= block_size:
+                        block = compute_block(block_size, thresholds)
+                        block_slot = 0
+                    rotation_count, actual_rpm, temp_left, temp_right, vibration_rms, bpfi, bpfo, bsf, ftf, alerts = block[block_slot]
+                    block_slot += 1
+                    tick += 1
+                    writerow([
+                        iso_timestamp(), sensor_id, rotation_count,
+                        f"{actual_rpm:.1f}",
+                        f"{temp_left:.1f}", f"{temp_right:.1f}",
+                        f"{vibration_rms:.4f}",
+                        f"{bpfi:.4f}",
+                        f"{bpfo:.4f}",
+                        f"{bsf:.4f}",
+                        f"{ftf:.4f}",
+                        alerts
+                    ])
+                    if tick % flush_every == 0:
+                        await asyncio.to_thread(sync_file, csvfile)
+                    await scheduler.wait_async()
+            finally:
+                sync_file(csvfile)
 
 if __name__ == "__main__":
     simulator = SmartIdlerSimulator()
@@ -132,7 +174,7 @@ if __name__ == "__main__":
         output_file = project_root / "data_output" / "conveyor_belt" / "smart_idler_data.csv"
         output_file.parent.mkdir(parents=True, exist_ok=True)
         print(f"Writing to: {output_file.resolve()}")
-        simulator.generate_data(output_file)
+        asyncio.run(simulator.generate_data(output_file))
     except KeyboardInterrupt:
         logger.info("Simulation stopped by user")
     except Exception as e:
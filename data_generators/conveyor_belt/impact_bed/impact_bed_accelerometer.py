@@ -1,93 +1,156 @@
+import asyncio
+import math
+import os
 import numpy as np
 import time
-import csv
-from datetime import datetime
 from pathlib import Path
 import logging
+import sys
+
+# Make the project root importable when this file is run directly as a script
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from data_generators.utils.simulation_utils import DeadlineScheduler, RotatingCsvWriter, iso_timestamp
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def generate_impact_bed_accelerometer_data(
+COLUMNS = [
+    "timestamp", "sensor_id", "accel_x_g",
+    "vibration_rms_g", "impact_peak_g", "impact_event",
+    "overrange", "alerts"
+]
+ROW_FORMAT = "{},{},{:.4f},{:.4f},{:.4f},{},{},{}\n"
+
+async def generate_impact_bed_accelerometer_data(
     sensor_id="ADXL1001-IMPACTBED-001",
     g_range=100,
     sensitivity_mV_per_g=20,
     base_freq_hz=50,
     sample_rate_hz=100,
+    batch_size=100,
+    sync_every=10,
+    rms_window=10,
 ):
+    """Stream impact bed accelerometer samples, computing and writing `batch_size` rows (1 s at 100 Hz) at a time.
+
+    Each batch is encoded once and appended with a single os.write on a raw O_APPEND fd, skipping
+    Python's file object layers; the fd is fsync'd every `sync_every` batches, in a worker thread so the
+    shared event loop never waits on the disk, and on exit.
+    vibration_rms_g is the RMS over the last `rms_window` samples (0.1 s at 100 Hz).
+    """
     project_root = Path(__file__).resolve().parents[3]
     output_path = project_root / "data_output/conveyor_belt/impact_bed_accelerometer.csv"
-    print("Writing to:", output_path)
+    logger.info("Writing impact bed accelerometer data to: %s", output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
     file_exists = output_path.exists() and output_path.stat().st_size > 0
 
-    t = 0
+    row_format = ROW_FORMAT.format
+    rng = np.random.default_rng()
+    sample = 0
     dt = 1.0 / sample_rate_hz
+
+    # The base signal repeats exactly every sample_rate_hz / gcd(sample_rate_hz, base_freq_hz)
+    # samples, so evaluate one period once and index it
+    period = sample_rate_hz // math.gcd(sample_rate_hz, base_freq_hz)
+    period_samples = np.arange(period)
+    base_lut = (5.0 * np.sin(2 * np.pi * base_freq_hz * period_samples / sample_rate_hz)
+                + 1.5 * np.sin(2 * np.pi * 3 * base_freq_hz * period_samples / sample_rate_hz))
     impact_duration = 0.2  # longer, smoother impact
     impact_samples = int(impact_duration * sample_rate_hz)
+    hann_window = np.hanning(impact_samples)
+    hann_peak = hann_window.max()  # just under 1 for an even window length
     impact_profile = np.zeros(impact_samples)
+    current_impact_peak = 0.0
+    # Squares of the last rms_window - 1 samples, carried across batches so the window slides continuously
+    rms_kernel = np.ones(rms_window)
+    squares_tail = np.zeros(rms_window - 1)
     impact_idx = 0
     impact_cooldown = 0
 
-    with open(output_path, 'a', newline='') as csvfile:
-        writer = csv.writer(csvfile)
+    fd = os.open(output_path, RotatingCsvWriter.OPEN_FLAGS, 0o644)
+    try:
         if not file_exists:
-            writer.writerow([
-                "timestamp", "sensor_id", "accel_x_g",
-                "vibration_rms_g", "impact_peak_g", "impact_event",
-                "overrange", "alerts"
-            ])
+            os.write(fd, (",".join(COLUMNS) + "\n").encode("ascii"))
+        scheduler = DeadlineScheduler(batch_size * dt, max_behind=5)
+        batches = 0
+        rows = []
         try:
             while True:
-                # ✅ Realistic base signal
-                base = 5.0 * np.sin(2 * np.pi * base_freq_hz * t)
-                harmonic = 1.5 * np.sin(2 * np.pi * 3 * base_freq_hz * t)
-                noise = np.random.normal(0, 0.8)  # stronger random noise
-                accel_x = base + harmonic + noise
+                batch_start = time.time()
 
-                # 🎯 Smooth impact spike simulation
-                if impact_cooldown == 0 and np.random.rand() < 0.005:
-                    peak = np.random.uniform(10, 25)
-                    impact_profile = np.hanning(impact_samples) * peak
-                    impact_cooldown = impact_samples
-                    impact_idx = 0
+                # ✅ Realistic base signal (fundamental + 3rd harmonic)
+                base = base_lut[(sample + np.arange(batch_size)) % period]
+                noise = rng.normal(0, 0.8, batch_size)  # stronger random noise
+                accel_x = base + noise
 
+                # 🎯 Smooth impact spike simulation
+                impact_event = np.zeros(batch_size, dtype=int)
+                impact_peak = np.zeros(batch_size)
+                idle_from = 0
+                # Finish an impact carried over from the previous batch
                 if impact_cooldown > 0:
-                    accel_x += impact_profile[impact_idx]
-                    impact_event = 1
-                    impact_peak = impact_profile.max()
-                    impact_idx += 1
-                    impact_cooldown -= 1
-                else:
-                    impact_event = 0
-                    impact_peak = 0
+                    k = min(impact_cooldown, batch_size)
+                    accel_x[:k] += impact_profile[impact_idx:impact_idx + k]
+                    impact_event[:k] = 1
+                    impact_peak[:k] = current_impact_peak
+                    impact_idx += k
+                    impact_cooldown -= k
+                    idle_from = k
+                # New impacts can only start while no impact is running
+                for start in np.flatnonzero(rng.random(batch_size) < 0.005):
+                    if start < idle_from:
+                        continue
+                    peak = rng.uniform(10, 25)
+                    impact_profile = hann_window * peak
+                    current_impact_peak = peak * hann_peak
+                    k = min(impact_samples, batch_size - start)
+                    accel_x[start:start + k] += impact_profile[:k]
+                    impact_event[start:start + k] = 1
+                    impact_peak[start:start + k] = current_impact_peak
+                    impact_idx = k
+                    impact_cooldown = impact_samples - k
+                    idle_from = start + k
 
-                overrange = int(abs(accel_x) > g_range)
-                vibration_rms = np.sqrt(accel_x ** 2)
+                overrange = (np.abs(accel_x) > g_range).astype(int)
+                squares = np.concatenate((squares_tail, accel_x * accel_x))
+                vibration_rms = np.sqrt(np.convolve(squares, rms_kernel, "valid") / rms_window)
+                squares_tail = squares[len(squares) - (rms_window - 1):]
 
-                if overrange:
-                    alerts = "OVERRANGE"
-                elif impact_event:
-                    alerts = "IMPACT DETECTED"
-                elif vibration_rms > 10:
-                    alerts = "HIGH VIBRATION"
-                else:
-                    alerts = "NORMAL"
+                alerts = np.select(
+                    [overrange == 1, impact_event == 1, vibration_rms > 10],
+                    ["OVERRANGE", "IMPACT DETECTED", "HIGH VIBRATION"],
+                    "NORMAL",
+                )
 
-                writer.writerow([
-                    datetime.now().isoformat(),
-                    sensor_id,
-                    round(accel_x, 4),
-                    round(vibration_rms, 4),
-                    round(impact_peak, 4),
-                    impact_event,
-                    overrange,
-                    alerts
-                ])
-                t += dt
-                time.sleep(dt)
-        except KeyboardInterrupt:
+                # All fields are numbers or fixed alert names, so no CSV quoting is needed
+                rows = [
+                    row_format(iso_timestamp(batch_start + i * dt), sensor_id, a, v, p, e, o, alert)
+                    for i, (a, v, p, e, o, alert) in enumerate(zip(
+                        accel_x.tolist(), vibration_rms.tolist(), impact_peak.tolist(),
+                        impact_event.tolist(), overrange.tolist(), alerts.tolist()))
+                ]
+                sample += batch_size
+                # The batch covers the next second of real time; write it once that has passed
+                await scheduler.wait_async()
+                os.write(fd, "".join(rows).encode("ascii"))
+                rows = []
+                batches += 1
+                if batches % sync_every == 0:
+                    await asyncio.to_thread(os.fsync, fd)
+        except asyncio.CancelledError:
             logger.info("Impact bed accelerometer simulation stopped")
+            raise
+        finally:
+            # Stopped mid-batch: keep only the rows whose timestamps have already passed
+            if rows:
+                os.write(fd, "".join(rows[:int((time.time() - batch_start) / dt)]).encode("ascii"))
+    finally:
+        os.fsync(fd)
+        os.close(fd)
 
 if __name__ == "__main__":
-    generate_impact_bed_accelerometer_data()
+    try:
+        asyncio.run(generate_impact_bed_accelerometer_data())
+    except KeyboardInterrupt:
+        pass
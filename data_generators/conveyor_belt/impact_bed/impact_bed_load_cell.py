@@ -1,14 +1,26 @@
+import asyncio
 import numpy as np
 import time
-import csv
-from datetime import datetime
 from pathlib import Path
 import logging
+import sys
+
+# Make the project root importable when this file is run directly as a script
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from data_generators.utils.simulation_utils import BatchedDraws, DeadlineScheduler, clamp, iso_timestamp, sync_file
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def generate_load_cell_data(
+COLUMNS = [
+    "timestamp", "sensor_id", "applied_load_kN",
+    "mv_per_v", "excitation_V", "temperature_C",
+    "impact_event", "alerts"
+]
+ROW_FORMAT = "{},{},{:.2f},{:.5f},{},{:.2f},{},{}\n"
+
+async def generate_load_cell_data(
     output_path="data_output/conveyor_belt/impact_bed_load_cell.csv",
     sensor_id="SGLC7050-IMPACTBED-001",
     loadcell_capacity_kN=2000,
@@ -16,92 +28,107 @@ def generate_load_cell_data(
     excitation_V=10.0,
     temp_nom_C=25.0,
     temp_effect_per_C=0.0001,
-    sample_rate_hz=1
+    sample_rate_hz=1,
+    batch_size=32
 ):
+    """Stream load cell samples, writing and flushing them `batch_size` rows at a time."""
     project_root = Path(__file__).resolve().parents[3]
     output_path = project_root / "data_output/conveyor_belt/impact_bed_load_cell.csv"
-    print("Writing to:", output_path)
+    logger.info("Writing load cell data to: %s", output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
     file_exists = output_path.exists() and output_path.stat().st_size > 0
 
     seconds_in_day = 24 * 3600
     impact_interval_s = 47
     impact_duration_s = 2
-
-    t0 = time.time()
-
-    with open(output_path, 'a', newline='') as csvfile:
-        writer = csv.writer(csvfile)
+    overload_limit = loadcell_capacity_kN * 1.5
+
+    row_format = ROW_FORMAT.format
+
+    # Everything but the noise is a deterministic function of the second of the day,
+    # so evaluate each column once for the whole day and look samples up by second
+    second_of_day = np.arange(seconds_in_day)
+    hour = second_of_day // 3600 + (second_of_day // 60 % 60) / 60.0
+
+    # Smooth daily load profile
+    base_load_by_second = np.select(
+        [(6 <= hour) & (hour < 8), (8 <= hour) & (hour < 18), (18 <= hour) & (hour < 20)],
+        [
+            loadcell_capacity_kN * ((hour - 6) / 2) * 0.8,
+            loadcell_capacity_kN * 0.8,
+            loadcell_capacity_kN * (1 - (hour - 18) / 2) * 0.8,
+        ],
+        loadcell_capacity_kN * 0.05,
+    ).tolist()
+
+    # Impact event simulation
+    impact_event_by_second = (second_of_day % impact_interval_s < impact_duration_s).astype(int).tolist()
+
+    # Temperature drift: sinusoidal daily pattern
+    temperature_by_second = (temp_nom_C + 10 * np.sin(2 * np.pi * second_of_day / seconds_in_day)).tolist()
+
+    # Scalar draws come out of pre-generated blocks instead of one NumPy call each
+    rng = np.random.default_rng()
+    load_noise = BatchedDraws(lambda n: rng.normal(0, loadcell_capacity_kN * 0.005, n))
+    impact_fraction = BatchedDraws(lambda n: rng.uniform(0.05, 0.2, n))
+
+    with open(output_path, 'ab', buffering=1 << 20) as csvfile:
         if not file_exists:
-            writer.writerow([
-                "timestamp", "sensor_id", "applied_load_kN",
-                "mv_per_v", "excitation_V", "temperature_C",
-                "impact_event", "alerts"
-            ])
+            csvfile.write((",".join(COLUMNS) + "\n").encode("ascii"))
+        batch = []
+        sample = 0
+        scheduler = DeadlineScheduler(1 / sample_rate_hz, max_behind=5)
         try:
             while True:
-                now = datetime.now()
-                t = (time.time() - t0) % seconds_in_day
-                hour = now.hour + now.minute / 60.0
-
-                # Smooth daily load profile
-                if 6 <= hour < 8:
-                    base_load = loadcell_capacity_kN * ((hour - 6) / 2) * 0.8
-                elif 8 <= hour < 18:
-                    base_load = loadcell_capacity_kN * 0.8
-                elif 18 <= hour < 20:
-                    base_load = loadcell_capacity_kN * (1 - (hour - 18) / 2) * 0.8
-                else:
-                    base_load = loadcell_capacity_kN * 0.05
+                now = time.time()
+                t = (sample / sample_rate_hz) % seconds_in_day
+                local = time.localtime(now)
+                seconds_today = local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec
 
                 # Add realistic fluctuations
-                noise = np.random.normal(0, loadcell_capacity_kN * 0.005)
-                base_load += noise
-                base_load = np.clip(base_load, 0, loadcell_capacity_kN * 1.5)
-
-                # Impact event simulation
-                seconds_today = now.hour * 3600 + now.minute * 60 + now.second
-                impact_phase = seconds_today % impact_interval_s
-                if impact_phase < impact_duration_s:
-                    impact_event = 1
-                    impact_load = np.random.uniform(0.05, 0.2) * loadcell_capacity_kN
-                else:
-                    impact_event = 0
-                    impact_load = 0
+                base_load = clamp(0, base_load_by_second[seconds_today] + next(load_noise), overload_limit)
+
+                impact_event = impact_event_by_second[seconds_today]
+                impact_load = next(impact_fraction) * loadcell_capacity_kN if impact_event else 0
 
                 total_load = base_load + impact_load
 
-                # Temperature drift: sinusoidal daily pattern
-                temperature = temp_nom_C + 10 * np.sin(2 * np.pi * (t / seconds_in_day))
+                temperature = temperature_by_second[int(t)]
 
                 # mV/V output
                 mv_per_v = (total_load / loadcell_capacity_kN) * rated_output_mV_per_V
                 mv_per_v *= (1 + temp_effect_per_C * (temperature - temp_nom_C))
 
                 # Alerts
-                if total_load > loadcell_capacity_kN * 1.5:
+                if total_load > overload_limit:
                     alerts = "OVERLOAD"
                 elif impact_event:
                     alerts = "IMPACT"
                 else:
                     alerts = "NORMAL"
 
-                # Write to CSV
-                writer.writerow([
-                    now.isoformat(),
-                    sensor_id,
-                    round(total_load, 2),
-                    round(mv_per_v, 5),
-                    excitation_V,
-                    round(temperature, 2),
-                    impact_event,
-                    alerts
-                ])
-
-                time.sleep(1 / sample_rate_hz)
-
-        except KeyboardInterrupt:
+                # Write to CSV; fields never need quoting, so lines are formatted directly
+                batch.append(row_format(
+                    iso_timestamp(now), sensor_id, total_load,
+                    mv_per_v, excitation_V, temperature, impact_event, alerts
+                ))
+                if len(batch) >= batch_size:
+                    csvfile.write("".join(batch).encode("ascii"))
+                    batch.clear()
+                    csvfile.flush()
+
+                sample += 1
+                await scheduler.wait_async()
+
+        except asyncio.CancelledError:
             logger.info("Impact bed load cell simulation stopped")
+            raise
+        finally:
+            csvfile.write("".join(batch).encode("ascii"))
+            sync_file(csvfile)
 
 if __name__ == "__main__":
-    generate_load_cell_data()
+    try:
+        asyncio.run(generate_load_cell_data())
+    except KeyboardInterrupt:
+        pass
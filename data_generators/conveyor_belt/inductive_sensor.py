@@ -1,17 +1,41 @@
+import asyncio
 import numpy as np
-import pandas as pd
-from datetime import datetime, timedelta
 import time
-import csv
 import logging
 from pathlib import Path
-from math import cos, pi
+import sys
+
+# Make the project root importable when this file is run directly as a script
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from data_generators.utils.simulation_utils import BatchedDraws, DeadlineScheduler, make_timestamp_formatter, run_deadline, sync_file
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# "%Y-%m-%d %H:%M:%S.mmm", the format this sensor's CSV has always used
+inductive_timestamp = make_timestamp_formatter("%Y-%m-%d %H:%M:%S", 3)
+
+COLUMNS = [
+    "timestamp", "sensor_id", "distance_to_target_mm",
+    "output_state", "switching_function"
+]
+ROW_FORMAT = "{},{},{:.2f},{},{}\n"
+
+
+def _inductive_step(distance, last_output, turn_on_distance, turn_off_distance, is_nc):
+    """One tick of the VERIFIED datasheet hysteresis and NO/NC logic: returns (internal_sensed, output)."""
+    previous_internal_sensing_state = 1 - last_output if is_nc else last_output
+
+    if previous_internal_sensing_state == 0:
+        internal_target_sensed_state = 1 if distance <= turn_on_distance else 0
+    else:
+        internal_target_sensed_state = 0 if distance > turn_off_distance else 1
+
+    return internal_target_sensed_state, 1 - internal_target_sensed_state if is_nc else internal_target_sensed_state
+
 
-def generate_realistic_inductive_data(
+async def generate_realistic_inductive_data(
         output_file_path,
         sensor_id: str = "NBN40-U1-E2-V1",
         time_interval_seconds: float = 0.1,
@@ -21,12 +45,14 @@ def generate_realistic_inductive_data(
         run_duration_seconds: int = None,
         conveyor_speed_mps: float = 0.5,
         object_spacing_m: float = 0.3,
-        object_length_m: float = 0.1
+        object_length_m: float = 0.1,
+        batch_size: int = 32
 ):
     """
     Generates realistic inductive sensor data following conveyor belt patterns.
     All datasheet specifications preserved exactly as per Pepperl+Fuchs NBN40-U1-E2-V1.
     Runs infinitely if run_duration_seconds is None.
+    Rows are written and flushed `batch_size` at a time.
     """
 
     logger.info(f"Sensor [{sensor_id}]: Starting realistic pattern generation")
@@ -35,11 +61,16 @@ def generate_realistic_inductive_data(
     else:
         logger.info(f"Sensor [{sensor_id}]: Running infinitely until stopped")
 
-    sim_start_time = datetime.now()
-
-    # Calculate realistic timing patterns
+    # Calculate realistic timing patterns, in ticks of time_interval_seconds
     time_between_objects = object_spacing_m / conveyor_speed_mps
     object_detection_time = object_length_m / conveyor_speed_mps
+    cycle_ticks = max(1, round(time_between_objects / time_interval_seconds))
+    detection_ticks = round(object_detection_time / time_interval_seconds)
+
+    # Define two realistic states, laid out over one object cycle
+    object_detected_distance = 53  # mm
+    no_object_distance = 58  # mm
+    distance_by_tick = [object_detected_distance] * detection_ticks + [no_object_distance] * (cycle_ticks - detection_ticks)
 
     # VERIFIED datasheet hysteresis calculations
     hysteresis_mm = rated_operating_distance_mm * hysteresis_percent
@@ -47,84 +78,67 @@ def generate_realistic_inductive_data(
     turn_off_distance = rated_operating_distance_mm + hysteresis_mm
 
     # Pattern state tracking
-    last_object_time = time.time()
-    last_electrical_output_state = 1 if switching_function.upper() == "NC" else 0
+    switching_function = switching_function.upper()
+    is_nc = switching_function == "NC"
+    last_electrical_output_state = 1 if is_nc else 0
+
+    # Distance noise comes out of pre-generated blocks instead of one NumPy call per sample
+    row_format = ROW_FORMAT.format
+    rng = np.random.default_rng()
+    distance_noise = BatchedDraws(lambda n: rng.normal(0, 0.3, n))
 
     output_file_path = Path(output_file_path)
     output_file_path.parent.mkdir(parents=True, exist_ok=True)
     file_exists = output_file_path.exists() and output_file_path.stat().st_size > 0
 
-    with open(output_file_path, 'a', newline='', encoding='utf-8') as csvfile:
-        csv_writer = csv.writer(csvfile)
-
+    with open(output_file_path, 'ab', buffering=1 << 20) as csvfile:
         if not file_exists:
-            csv_writer.writerow([
-                "timestamp", "sensor_id", "distance_to_target_mm",
-                "output_state", "switching_function"
-            ])
+            csvfile.write((",".join(COLUMNS) + "\n").encode("ascii"))
 
         i = 0
+        batch = []
+        scheduler = DeadlineScheduler(time_interval_seconds, max_behind=5)
+        deadline = run_deadline(run_duration_seconds)
         try:
             while True:
-                # Check duration only if specified
-                if run_duration_seconds and (datetime.now() - sim_start_time).total_seconds() > run_duration_seconds:
+                if time.monotonic() >= deadline:
                     break
-
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
                 current_time = time.time()
 
-                time_since_last_object = current_time - last_object_time
-                time_in_cycle = time_since_last_object % time_between_objects
-
-                # Define two realistic states
-                object_detected_distance = 53  # mm
-                no_object_distance = 58  # mm
-
-                if time_in_cycle < object_detection_time:
-                    distance_to_target = object_detected_distance + np.random.normal(0, 0.3)
-                else:
-                    distance_to_target = no_object_distance + np.random.normal(0, 0.3)
-
-                distance_to_target = max(0, distance_to_target)
+                timestamp = inductive_timestamp(current_time)
 
-                # Apply VERIFIED hysteresis logic from datasheet
-                previous_internal_sensing_state = 0
-                if switching_function.upper() == "NO":
-                    previous_internal_sensing_state = last_electrical_output_state
-                elif switching_function.upper() == "NC":
-                    previous_internal_sensing_state = 1 - last_electrical_output_state
+                distance_to_target = distance_by_tick[i % cycle_ticks] + next(distance_noise)
 
-                if previous_internal_sensing_state == 0:
-                    internal_target_sensed_state = 1 if distance_to_target <= turn_on_distance else 0
-                else:
-                    internal_target_sensed_state = 0 if distance_to_target > turn_off_distance else 1
+                if distance_to_target < 0:
+                    distance_to_target = 0
 
-                # Apply VERIFIED NO/NC logic from datasheet
-                if switching_function.upper() == "NO":
-                    current_electrical_output_state = internal_target_sensed_state
-                elif switching_function.upper() == "NC":
-                    current_electrical_output_state = 1 - internal_target_sensed_state
+                internal_target_sensed_state, current_electrical_output_state = _inductive_step(
+                    distance_to_target, last_electrical_output_state, turn_on_distance, turn_off_distance, is_nc)
 
                 last_electrical_output_state = current_electrical_output_state
 
-                csv_writer.writerow([
-                    timestamp,
-                    sensor_id,
-                    round(distance_to_target, 2),
-                    current_electrical_output_state,
-                    switching_function.upper()
-                ])
+                # Fields never need quoting, so lines are formatted directly
+                batch.append(row_format(
+                    timestamp, sensor_id, distance_to_target,
+                    current_electrical_output_state, switching_function
+                ))
+                if len(batch) >= batch_size:
+                    csvfile.write("".join(batch).encode("ascii"))
+                    batch.clear()
+                    csvfile.flush()
 
                 i += 1
                 if i % 1000 == 0:
-                    logger.debug(f"Sensor [{sensor_id}]: Generated {i} points")
+                    logger.debug("Sensor [%s]: Generated %d points", sensor_id, i)
 
-                time.sleep(time_interval_seconds)
+                await scheduler.wait_async()
 
-        except KeyboardInterrupt:
+        except asyncio.CancelledError:
             logger.info(f"Sensor [{sensor_id}]: Stopped by user interrupt")
-        except Exception as e:
-            logger.error(f"Sensor [{sensor_id}]: Error occurred: {e}")
+            raise
+        finally:
+            csvfile.write("".join(batch).encode("ascii"))
+            sync_file(csvfile)
 
     logger.info(f"Sensor [{sensor_id}]: Completed. Generated {i} data points.")
 
@@ -132,4 +146,7 @@ def generate_realistic_inductive_data(
 if __name__ == "__main__":
     # Run inductive sensor infinitely
     output_path = "../../data_output/conveyor_belt/inductive_NBN40-CB1-PRESENCE_data.csv"
-    generate_realistic_inductive_data(output_path, run_duration_seconds=None)
+    try:
+        asyncio.run(generate_realistic_inductive_data(output_path, run_duration_seconds=None))
+    except KeyboardInterrupt:
+        pass
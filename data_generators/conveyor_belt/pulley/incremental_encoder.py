@@ -1,14 +1,23 @@
 # data_generators/conveyor_belt/pulley/incremental_encoder.py
+import asyncio
 import time
-import csv
 import logging
 import numpy as np
-from datetime import datetime
 from pathlib import Path
+import sys
+
+# Make the project root importable when this file is run directly as a script
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+
+from data_generators.utils.simulation_utils import DeadlineScheduler, iso_timestamp, run_deadline, sync_file
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+COLUMNS = ["timestamp", "sensor_id", "rpm", "pulse_count", "direction", "status"]
+# Status and direction are fixed keywords, so no field ever needs CSV quoting
+ROW_FORMAT = "{},{},{:.1f},{},{},{}\n"
+
 
 class IncrementalEncoderSimulator:
     def __init__(self, sensor_id="INC-ENC-001"):
@@ -18,6 +27,7 @@ class IncrementalEncoderSimulator:
         self.pulse_count = 0
         self.direction = 1  # 1=forward, -1=reverse
         self.status = "NORMAL"
+        self._rng = np.random.default_rng()
 
         # From HOG10 datasheet specs
         self.operational_limits = {
@@ -28,57 +38,76 @@ class IncrementalEncoderSimulator:
         }
 
     def generate_pulses(self, rpm):
-        """Simulate encoder output based on RPM"""
+        """Simulate encoder output based on RPM (scalar or array)"""
         pulses_per_second = (rpm / 60) * self.ppr
-        return int(pulses_per_second * self.sampling_interval)
+        return np.asarray(pulses_per_second * self.sampling_interval).astype(np.int64)
 
     def check_status(self, rpm):
-        """Simulate encoder status monitoring"""
-        if rpm > self.operational_limits['max_rpm']:
-            return "OVERSPEED"
-        if np.random.rand() < 0.002:  # 0.2% chance of random error
-            return "SIGNAL_ERROR"
-        return "NORMAL"
-
-    def generate_data(self, output_path, duration_hours=None):
+        """Simulate encoder status monitoring for an array of RPM samples"""
+        return np.where(
+            rpm > self.operational_limits['max_rpm'], "OVERSPEED",
+            np.where(self._rng.random(len(rpm)) < 0.002, "SIGNAL_ERROR", "NORMAL")  # 0.2% chance of random error
+        )
+
+    def generate_batch(self, n):
+        """Simulate the next n ticks at once, returning (rpm, pulse_count, direction, status) arrays"""
+        # Simulate RPM with random variations
+        base_rpm = 400  # Normal operating RPM
+        rpm = np.clip(base_rpm * self._rng.uniform(0.98, 1.02, n), 0, self.operational_limits['max_rpm'])
+
+        # Each tick counts its pulses in the direction left by the previous tick,
+        # then possibly reverses (1% chance)
+        direction = np.where(self._rng.random(n) > 0.01, 1, -1)
+        counted_direction = np.concatenate(([self.direction], direction[:-1]))
+        pulse_count = self.pulse_count + np.cumsum(self.generate_pulses(rpm) * counted_direction)
+        self.pulse_count = int(pulse_count[-1])
+        self.direction = int(direction[-1])
+
+        # Update status
+        status = self.check_status(rpm)
+        self.status = str(status[-1])
+        return rpm, pulse_count, direction, status
+
+    async def generate_data(self, output_path, duration_hours=None, batch_size=100):
+        """Stream encoder samples, computing and writing `batch_size` ticks (1 s at 100 Hz) at a time"""
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
 
-        with open(output_path, 'w', newline='') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow([
-                "timestamp", "sensor_id", "rpm",
-                "pulse_count", "direction", "status"
-            ])
-
-            start_time = time.time()
-            while True:
-                if duration_hours and (time.time() - start_time) > duration_hours * 3600:
-                    break
-
-                # Simulate RPM with random variations
-                base_rpm = 400  # Normal operating RPM
-                rpm = base_rpm * np.random.uniform(0.98, 1.02)
-                rpm = np.clip(rpm, 0, self.operational_limits['max_rpm'])
-
-                # Generate pulses and direction
-                new_pulses = self.generate_pulses(rpm)
-                self.pulse_count += new_pulses * self.direction
-                self.direction = 1 if np.random.rand() > 0.01 else -1  # 1% chance to reverse
-
-                # Update status
-                self.status = self.check_status(rpm)
-
-                writer.writerow([
-                    datetime.now().isoformat(),
-                    self.sensor_id,
-                    round(rpm, 1),
-                    self.pulse_count,
-                    "FORWARD" if self.direction == 1 else "REVERSE",
-                    self.status
-                ])
-
-                time.sleep(self.sampling_interval)
+        with open(output_path, 'w', newline='', buffering=1 << 20) as csvfile:
+            csvfile.write(",".join(COLUMNS) + "\n")
+
+            row_format = ROW_FORMAT.format
+            write = csvfile.write
+            flush = csvfile.flush
+            generate_batch = self.generate_batch
+            sensor_id = self.sensor_id
+            dt = self.sampling_interval
+            deadline = run_deadline(duration_hours and duration_hours * 3600)
+            scheduler = DeadlineScheduler(batch_size * dt, max_behind=5)
+            rows = []
+            try:
+                while True:
+                    if time.monotonic() >= deadline:
+                        break
+
+                    batch_start = time.time()
+                    rpm, pulse_count, direction, status = generate_batch(batch_size)
+                    rows = [
+                        row_format(iso_timestamp(batch_start + i * dt), sensor_id, r, p, "FORWARD" if d == 1 else "REVERSE", st)
+                        for i, (r, p, d, st) in enumerate(zip(
+                            rpm.tolist(), pulse_count.tolist(), direction.tolist(), status.tolist()))
+                    ]
+
+                    # The batch covers the next second of real time; write it once that has passed
+                    await scheduler.wait_async()
+                    write("".join(rows))
+                    rows = []
+                    flush()
+            finally:
+                # Stopped mid-batch: keep only the rows whose timestamps have already passed
+                if rows:
+                    write("".join(rows[:int((time.time() - batch_start) / dt)]))
+                sync_file(csvfile)
 
 
 if __name__ == "__main__":
@@ -88,7 +117,7 @@ if __name__ == "__main__":
         project_root = Path(__file__).resolve().parent.parent.parent.parent
         output_file = project_root / "data_output" / "conveyor_belt" / "incremental_encoder_data.csv"
         output_file.parent.mkdir(parents=True, exist_ok=True)
-        encoder.generate_data(output_file)
+        asyncio.run(encoder.generate_data(output_file))
     except KeyboardInterrupt:
         logger.info("Simulation stopped by user")
     except Exception as e:
@@ -1,15 +1,48 @@
+import asyncio
 import numpy as np
-import pandas as pd
-from datetime import datetime
 import time
-import csv
 import logging
 from pathlib import Path
+import sys
+
+# Make the project root importable when this file is run directly as a script
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from data_generators.utils.simulation_utils import BackgroundCsvWriter, BatchedDraws, DeadlineScheduler, make_timestamp_formatter, run_deadline
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def generate_realistic_ultrasonic_data(
+# "%Y-%m-%d %H:%M:%S.mmm", the format this sensor's CSV has always used
+ultrasonic_timestamp = make_timestamp_formatter("%Y-%m-%d %H:%M:%S", 3)
+
+COLUMNS = [
+    "timestamp", "sensor_id", "distance_mm", "output_state",
+    "switching_events", "uptime_seconds", "production_phase"
+]
+# Phase labels and the sensor id never contain commas, so lines are formatted directly
+ROW_FORMAT = "{},{},{:.1f},{},{},{:.2f},{}\n"
+
+PRODUCTION_PATTERNS = [
+    {"name": "high_throughput", "object_frequency": 0.7, "cycle_speed": 1.0},
+    {"name": "medium_throughput", "object_frequency": 0.5, "cycle_speed": 0.8},
+    {"name": "low_throughput", "object_frequency": 0.3, "cycle_speed": 0.6}
+]
+
+
+def build_pattern_windows():
+    """Each pattern's (object cycle time, detection window start, detection window end, phase label)."""
+    windows = []
+    for pattern in PRODUCTION_PATTERNS:
+        detection_start = (1.0 - pattern["object_frequency"]) / 2
+        windows.append((3.0 / pattern["cycle_speed"], detection_start,
+                        detection_start + pattern["object_frequency"], f"production_{pattern['name']}"))
+    return windows
+
+PATTERN_WINDOWS = build_pattern_windows()
+
+
+async def generate_realistic_ultrasonic_data(
         output_file_path,
         sensor_id: str = "UB800-18GM60-E5-V1-M",
         time_interval_seconds: float = 0.1,
@@ -17,10 +50,13 @@ def generate_realistic_ultrasonic_data(
         a2_threshold_mm: int = 600,  # Teachable far threshold
         run_duration_seconds: int = None,
         production_cycle_minutes: float = 5.0,
-        shift_hours: tuple = (6, 22)
+        shift_hours: tuple = (6, 22),
+        batch_size: int = 32
 ):
     """
     Generates realistic ultrasonic sensor data with both analog distance and digital switch output.
+    Rows are handed to a background writer thread, which writes and flushes them up to `batch_size`
+    at a time and fsyncs on exit, so file I/O never delays the sampling loop.
     """
     logger.info(f"Sensor [{sensor_id}]: Starting analog+switch-output ultrasonic simulation")
     if run_duration_seconds:
@@ -28,127 +64,124 @@ def generate_realistic_ultrasonic_data(
     else:
         logger.info(f"Sensor [{sensor_id}]: Running infinitely until stopped")
 
-    sim_start_time = datetime.now()
+    sim_start_time = time.monotonic()
     production_cycle_seconds = production_cycle_minutes * 60
-    cycle_start_time = time.time()
+    cycle_start_time = sim_start_time
 
     switching_events = 0
     last_output_state = 0
 
-    production_patterns = [
-        {"name": "high_throughput", "object_frequency": 0.7, "cycle_speed": 1.0},
-        {"name": "medium_throughput", "object_frequency": 0.5, "cycle_speed": 0.8},
-        {"name": "low_throughput", "object_frequency": 0.3, "cycle_speed": 0.6}
-    ]
     current_pattern = 0
 
+    # Loop invariants, worked out once instead of every tick
+    near_lo, near_hi = a1_threshold_mm + 10, a2_threshold_mm - 10  # object inside the switching window
+    far_lo = a2_threshold_mm + 10                                    # nothing closer than the far threshold
+    shift_start, shift_end = shift_hours
+
+    # Each distance range gets its own block of pre-drawn samples, refilled every 4096 uses
+    rng = np.random.default_rng()
+    idle_distances = BatchedDraws(lambda n: rng.uniform(700, 800, n))  # no production, nothing in range
+    loading_distances = BatchedDraws(lambda n: rng.uniform(650, 800, n))
+    object_distances = BatchedDraws(lambda n: rng.uniform(near_lo, near_hi, n))
+    background_distances = BatchedDraws(lambda n: rng.uniform(far_lo, 800, n))
+
     output_file_path = Path(output_file_path)
-    output_file_path.parent.mkdir(parents=True, exist_ok=True)
-    file_exists = output_file_path.exists() and output_file_path.stat().st_size > 0
-
-    with open(output_file_path, 'a', newline='', encoding='utf-8') as csvfile:
-        csv_writer = csv.writer(csvfile)
-
-        if not file_exists:
-            csv_writer.writerow([
-                "timestamp", "sensor_id", "distance_mm", "output_state",
-                "switching_events", "uptime_seconds", "production_phase"
-            ])
-
-        i = 0
-        try:
-            while True:
-                if run_duration_seconds and (datetime.now() - sim_start_time).total_seconds() > run_duration_seconds:
-                    break
-
-                now = datetime.now()
-                timestamp = now.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-                current_hour = now.hour
-                uptime = (now - sim_start_time).total_seconds()
-
-                # Check if in production hours
-                is_production_active = shift_hours[0] <= current_hour <= shift_hours[1]
-
-                if not is_production_active:
-                    # No production - no objects detected
-                    distance_mm = np.random.uniform(700, 800)  # Far distance (no object)
+    writer = BackgroundCsvWriter(str(output_file_path), COLUMNS, ROW_FORMAT, batch_size=batch_size)
+
+    # Bound once, as the loop body runs every tick
+    put = writer.put
+    clock = time.time
+    monotonic = time.monotonic
+    localtime = time.localtime
+
+    deadline = run_deadline(run_duration_seconds)
+    scheduler = DeadlineScheduler(time_interval_seconds, max_behind=5)
+    i = 0
+    try:
+        while True:
+            now_mono = monotonic()
+            if now_mono >= deadline:
+                break
+
+            now = clock()
+            timestamp = ultrasonic_timestamp(now)
+            current_hour = localtime(now).tm_hour
+            uptime = now_mono - sim_start_time
+
+            # Check if in production hours
+            is_production_active = shift_start <= current_hour <= shift_end
+
+            if not is_production_active:
+                # No production - no objects detected
+                distance_mm = next(idle_distances)  # Far distance (no object)
+                current_output_state = 0
+                production_phase = "idle"
+            else:
+                # Production cycle pattern
+                time_in_cycle = (now_mono - cycle_start_time) % production_cycle_seconds
+                cycle_progress = time_in_cycle / production_cycle_seconds
+
+                if cycle_progress < 0.1:
+                    # Cycle start - loading, no objects yet
+                    distance_mm = next(loading_distances)
                     current_output_state = 0
-                    production_phase = "idle"
-                else:
-                    # Production cycle pattern
-                    time_in_cycle = (time.time() - cycle_start_time) % production_cycle_seconds
-                    cycle_progress = time_in_cycle / production_cycle_seconds
-
-                    if cycle_progress < 0.1:
-                        # Cycle start - loading, no objects yet
-                        distance_mm = np.random.uniform(650, 800)
+                    production_phase = "loading"
+                elif cycle_progress < 0.8:
+                    # Production active - objects moving through detection zone
+                    if i % 500 == 0:
+                        current_pattern = (current_pattern + 1) % len(PATTERN_WINDOWS)
+                    object_cycle_time, detection_start, detection_end, production_phase = PATTERN_WINDOWS[current_pattern]
+
+                    object_position = (uptime % object_cycle_time) / object_cycle_time
+
+                    if detection_start < object_position < detection_end:
+                        # Object present: random distance in detection window
+                        distance_mm = next(object_distances)
+                        current_output_state = 1
+                    else:
+                        # No object: random far distance
+                        distance_mm = next(background_distances)
                         current_output_state = 0
-                        production_phase = "loading"
-                    elif cycle_progress < 0.8:
-                        # Production active - objects moving through detection zone
-                        if i % 500 == 0:
-                            current_pattern = (current_pattern + 1) % len(production_patterns)
-                        pattern = production_patterns[current_pattern]
-
-                        object_cycle_time = 3.0 / pattern["cycle_speed"]
-                        object_position = (uptime % object_cycle_time) / object_cycle_time
-
-                        object_detection_window = pattern["object_frequency"]
-                        detection_start = (1.0 - object_detection_window) / 2
-                        detection_end = detection_start + object_detection_window
-
-                        if detection_start < object_position < detection_end:
-                            # Object present: random distance in detection window
-                            distance_mm = np.random.uniform(a1_threshold_mm + 10, a2_threshold_mm - 10)
-                            current_output_state = 1
-                        else:
-                            # No object: random far distance
-                            distance_mm = np.random.uniform(a2_threshold_mm + 10, 800)
-                            current_output_state = 0
-
-                        production_phase = f"production_{pattern['name']}"
+                else:
+                    # Cycle end - unloading, sporadic objects
+                    unload_cycle = (uptime % 2.0) / 2.0
+                    if unload_cycle < 0.3:
+                        distance_mm = next(object_distances)
+                        current_output_state = 1
                     else:
-                        # Cycle end - unloading, sporadic objects
-                        unload_cycle = (uptime % 2.0) / 2.0
-                        if unload_cycle < 0.3:
-                            distance_mm = np.random.uniform(a1_threshold_mm + 10, a2_threshold_mm - 10)
-                            current_output_state = 1
-                        else:
-                            distance_mm = np.random.uniform(a2_threshold_mm + 10, 800)
-                            current_output_state = 0
-                        production_phase = "unloading"
-
-                # Count switching events
-                if current_output_state != last_output_state:
-                    switching_events += 1
-                    logger.debug(
-                        f"Sensor [{sensor_id}]: Output switched to {current_output_state} (Event #{switching_events})")
-
-                last_output_state = current_output_state
-
-                csv_writer.writerow([
-                    timestamp,
-                    sensor_id,
-                    round(distance_mm, 1),
-                    current_output_state,
-                    switching_events,
-                    round(uptime, 2),
-                    production_phase
-                ])
-
-                i += 1
-                if i % 1000 == 0:
-                    logger.debug(f"Sensor [{sensor_id}]: Generated {i} points, {switching_events} switching events")
-
-                time.sleep(time_interval_seconds)
-
-        except KeyboardInterrupt:
-            logger.info(f"Sensor [{sensor_id}]: Stopped by user interrupt")
-        except Exception as e:
-            logger.error(f"Sensor [{sensor_id}]: Error occurred: {e}")
+                        distance_mm = next(background_distances)
+                        current_output_state = 0
+                    production_phase = "unloading"
+
+            # Count switching events
+            if current_output_state != last_output_state:
+                switching_events += 1
+                logger.debug("Sensor [%s]: Output switched to %d (Event #%d)",
+                             sensor_id, current_output_state, switching_events)
+
+            last_output_state = current_output_state
+
+            put(timestamp, sensor_id, distance_mm, current_output_state,
+                switching_events, uptime, production_phase)
+
+            i += 1
+            if i % 1000 == 0:
+                logger.debug("Sensor [%s]: Generated %d points, %d switching events", sensor_id, i, switching_events)
+
+            await scheduler.wait_async()
+
+    except asyncio.CancelledError:
+        logger.info(f"Sensor [{sensor_id}]: Stopped by user interrupt")
+        raise
+    finally:
+        # close() joins the writer thread, so keep it off the shared event loop
+        await asyncio.to_thread(writer.close)
 
     logger.info(f"Sensor [{sensor_id}]: Completed. Generated {i} data points, {switching_events} switching events.")
 
 if __name__ == "__main__":
     output_path = "../../data_output/conveyor_belt/ultrasonic_UB800-CB1-MAIN_data.csv"
-    generate_realistic_ultrasonic_data(output_path, run_duration_seconds=None)
+    try:
+        asyncio.run(generate_realistic_ultrasonic_data(output_path, run_duration_seconds=None))
+    except KeyboardInterrupt:
+        pass
@@ -1 +1,321 @@
- 
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def make_timestamp_formatter(seconds_format="%Y-%m-%dT%H:%M:%S", digits=6):
+    """Build a formatter for epoch times (default: now) as local `seconds_format` plus `digits` fractional digits.
+
+    The strftime'd seconds prefix is cached, so within the same second only the fraction is formatted.
+    """
+    scale = 10 ** digits
+    cache = [(None, "")]  # one (second, prefix) tuple, swapped atomically so threads can share it
+
+    def format_timestamp(now=None):
+        if now is None:
+            now = time.time()
+        seconds = int(now)
+        cached_second, prefix = cache[0]
+        if seconds != cached_second:
+            prefix = time.strftime(seconds_format, time.localtime(seconds))
+            cache[0] = (seconds, prefix)
+        return f"{prefix}.{int((now - seconds) * scale):0{digits}d}"
+
+    return format_timestamp
+
+
+# Same output as datetime.now().isoformat(), without building a datetime
+iso_timestamp = make_timestamp_formatter()
+
+
+def clamp(lo, x, hi):
+    """Clamp a scalar to [lo, hi] with plain comparisons instead of max()/min() calls."""
+    return lo if x < lo else hi if x > hi else x
+
+
+def sync_file(f):
+    """Push a file object's buffered rows to the OS and fsync them to disk."""
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def run_deadline(run_duration_seconds=None):
+    """time.monotonic() value at which a run of `run_duration_seconds` ends, or inf for an unbounded run.
+
+    Loops then stop on a single `time.monotonic() >= deadline` compare per tick, whether or not a duration was given.
+    """
+    if not run_duration_seconds:
+        return float("inf")
+    return time.monotonic() + run_duration_seconds
+
+
+class DeadlineScheduler:
+    """Paces a loop on a fixed grid of time.monotonic() deadlines, so time spent in the loop body doesn't drift the sample rate.
+
+    With `max_behind` set, a loop that falls more than that many intervals behind drops the missed
+    ticks and restarts the grid from now, instead of catching up with a burst of back-to-back rows.
+    """
+
+    def __init__(self, interval, max_behind=None):
+        self.interval = interval
+        self.max_behind = max_behind
+        self.next_tick = time.monotonic()
+
+    def _advance(self):
+        self.next_tick += self.interval
+        remaining = self.next_tick - time.monotonic()
+        if self.max_behind is not None and remaining < -self.max_behind * self.interval:
+            self.next_tick -= remaining
+            remaining = 0
+        return remaining
+
+    def wait(self):
+        """Sleep until the next deadline on the grid."""
+        remaining = self._advance()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    async def wait_async(self):
+        """Like wait(), but yields to the event loop instead of blocking the thread.
+
+        A loop that is behind, or within a millisecond of its deadline, still yields via
+        asyncio.sleep(0), which skips the timer heap; all sensors share one event loop,
+        so a late sensor must not starve the others.
+        """
+        remaining = self._advance()
+        await asyncio.sleep(remaining if remaining >= 1e-3 else 0)
+
+
+class BatchedDraws:
+    """Hands out scalar random draws one at a time from blocks generated by `draw(size)`.
+
+    Each NumPy call then fills `size` samples, instead of paying the call overhead per sample.
+    """
+
+    def __init__(self, draw, size=4096):
+        self._draw = draw
+        self._size = size
+        self._refill()
+
+    def _refill(self):
+        self._values = self._draw(self._size).tolist()
+        self._index = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._index >= self._size:
+            self._refill()
+        value = self._values[self._index]
+        self._index += 1
+        return value
+
+
+class RotatingCsvWriter:
+    """Appends rows to `path` as CSV lines built with `row_format`, writing them `batch_size` at a time.
+
+    Rows are pure ASCII, so each batch is encoded once and handed to os.write on an O_APPEND fd,
+    skipping the TextIOWrapper/BufferedWriter layers of open().
+
+    With `rotate_seconds` set, the live file is closed on each boundary and atomically renamed
+    (os.replace) to `<name>.<YYYYmmdd-HHMMSSmmm>.csv`, stamped with the segment's start time,
+    then a fresh live file is started with the header.
+    A crash can then only ever lose the batch in flight, never tear a finished segment.
+    Batches go to the OS page cache; the file is fsync'd when it is closed or rotated.
+    """
+
+    OPEN_FLAGS = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+
+    def __init__(self, path, header, row_format, batch_size=32, rotate_seconds=None):
+        self.path = path
+        self.header = (",".join(header) + "\n").encode("ascii")
+        self._format = row_format.format
+        self.batch_size = batch_size
+        self.rotate_seconds = rotate_seconds
+        self._rows = []
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._open()
+
+    def _open(self):
+        is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._fd = os.open(self.path, self.OPEN_FLAGS, 0o644)
+        if is_new:
+            os.write(self._fd, self.header)
+        if self.rotate_seconds:
+            self._rotate_at = time.monotonic() + self.rotate_seconds
+            self._opened_at = time.time()
+
+    def write(self, *values):
+        self._rows.append(self._format(*values))
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+        if self.rotate_seconds and time.monotonic() >= self._rotate_at:
+            self.rotate()
+
+    def flush(self):
+        if self._rows:
+            os.write(self._fd, "".join(self._rows).encode("ascii"))
+            self._rows.clear()
+
+    def rotate(self):
+        """Close the live file, move it aside as a finished segment and start a new one."""
+        self.close()
+        base, ext = os.path.splitext(self.path)
+        started = time.strftime("%Y%m%d-%H%M%S", time.localtime(self._opened_at))
+        os.replace(self.path, f"{base}.{started}{int(self._opened_at % 1 * 1000):03d}{ext}")
+        self._open()
+
+    def close(self):
+        self.flush()
+        os.fsync(self._fd)
+        os.close(self._fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ArrowStreamWriter:
+    """Streams rows to an Arrow IPC file as typed record batches of `batch_size` rows.
+
+    IPC streams can't be appended to, so each run writes its own `<name>.<YYYYmmdd-HHMMSS>.arrow`
+    next to `path`. The schema is inferred from the first batch.
+    """
+
+    def __init__(self, path, header, batch_size=32):
+        import pyarrow as pa
+
+        self._pa = pa
+        self.header = header
+        self.batch_size = batch_size
+        base = os.path.splitext(path)[0]
+        self.path = f"{base}.{time.strftime('%Y%m%d-%H%M%S')}.arrow"
+        self._rows = []
+        self._schema = None
+        self._writer = None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def write(self, *values):
+        self._rows.append(values)
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        columns = {name: list(column) for name, column in zip(self.header, zip(*self._rows))}
+        batch = self._pa.RecordBatch.from_pydict(columns, schema=self._schema)
+        if self._writer is None:
+            self._schema = batch.schema
+            self._writer = self._pa.ipc.new_stream(self.path, self._schema)
+        self._writer.write_batch(batch)
+        self._rows.clear()
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BackgroundCsvWriter:
+    """Appends rows to `path` as CSV lines built with `row_format`, from a dedicated writer thread fed through a bounded queue.
+
+    put() never blocks the simulation loop: a stalled disk only fills the queue, and once
+    `max_pending` rows are waiting new rows are dropped with a warning rather than delaying samples.
+    The writer thread collects rows until it has `batch_size` of them or the oldest has waited
+    `flush_interval` seconds, then formats and writes them as one ASCII string and flushes;
+    close() writes whatever is still queued, fsyncs and closes the file. It blocks for up to
+    `timeout` seconds, so coroutines should call it through asyncio.to_thread().
+    """
+
+    _STOP = object()
+
+    def __init__(self, path, header, row_format, batch_size=256, max_pending=10000, flush_interval=5.0):
+        self.path = path
+        self._format = row_format.format
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(max_pending)
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, 'ab', buffering=1 << 20)
+        if is_new:
+            self._file.write((",".join(header) + "\n").encode("ascii"))
+        self._thread = threading.Thread(target=self._run, name=f"csv_writer:{os.path.basename(path)}", daemon=True)
+        self._thread.start()
+
+    def put(self, *values):
+        try:
+            self._queue.put_nowait(values)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning("%s: writer falling behind, %d rows dropped so far", self.path, self.dropped)
+
+    def _run(self):
+        get = self._queue.get
+        row_format = self._format
+        stopping = False
+        while not stopping:
+            batch = [get()]
+            flush_at = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not self._STOP:
+                remaining = flush_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if batch[-1] is self._STOP:
+                batch.pop()
+                stopping = True
+            self._file.write("".join([row_format(*row) for row in batch]).encode("ascii"))
+            self._file.flush()
+        sync_file(self._file)
+        self._file.close()
+
+    def close(self, timeout=5.0):
+        if self._thread.is_alive():
+            try:
+                self._queue.put(self._STOP, timeout=timeout)
+            except queue.Full:
+                logger.warning("%s: writer thread not draining, %d queued rows lost", self.path, self._queue.qsize())
+            self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("%s: writer thread did not finish within %ss", self.path, timeout)
+        elif not self._file.closed:
+            # The writer thread died without closing the file
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_stream_writer(output_path, header, row_format, batch_size=32, rotate_seconds=None, writer_backend="csv"):
+    """Open the row writer for a sensor stream: "csv" (default, what the dashboard reads) or "arrow"."""
+    if writer_backend == "csv":
+        return RotatingCsvWriter(output_path, header, row_format, batch_size, rotate_seconds)
+    if writer_backend == "arrow":
+        if rotate_seconds:
+            raise ValueError("rotate_seconds is only supported by the csv writer backend")
+        return ArrowStreamWriter(output_path, header, batch_size)
+    raise ValueError(f"Unknown writer_backend: {writer_backend!r}")
@@ -1,4 +1,7 @@
+import asyncio
+import inspect
 import threading
+import time
 import logging
 from pathlib import Path
 import sys
@@ -42,6 +45,12 @@ class MainDataGenerator:
         BALL_MILL_DATA_DIR.mkdir(parents=True, exist_ok=True)
         self.running = False
         self.threads = []
+        self._shutdown = threading.Event()  # set once every sensor has finished, or on stop
+        self._active_lock = threading.Lock()
+        self._active_count = 0
+        self._async_loop = None
+        self._async_task = None
+        self._failed = []  # descriptions of sensors that raised
 
         self.sensor_configs = {
             # Conveyor Belt Sensors
@@ -147,6 +156,9 @@ class MainDataGenerator:
 
         self.running = True
         self.threads = []
+        self._shutdown.clear()
+        self._failed = []
+        async_sensors = []
 
         for sensor_type, config in self.sensor_configs.items():
             sensor_kwargs = {}
@@ -158,7 +170,7 @@ class MainDataGenerator:
             # Set arguments as required by each sensor function
             if sensor_type in ["smart_idler", "incremental_encoder"]:
                 sensor_kwargs["output_path"] = output_path
-                if duration_seconds is not None and sensor_type == "smart_idler":
+                if duration_seconds is not None:
                     sensor_kwargs["duration_hours"] = duration_seconds / 3600
 
             elif sensor_type in ["inductive", "ultrasonic", "heat"]:
@@ -166,36 +178,43 @@ class MainDataGenerator:
                 if duration_seconds is not None:
                     sensor_kwargs["run_duration_seconds"] = duration_seconds
 
-            elif sensor_type == "touchswitch_conveyor":
+            elif sensor_type in ["touchswitch_conveyor", "touchswitch_pulley"]:
                 sensor_kwargs["output_path"] = output_path
                 if duration_seconds is not None:
                     sensor_kwargs["run_duration_seconds"] = duration_seconds
 
-
             elif sensor_type in ["s20_pressure", "tr10b_temperature", "mill_shell_vibration", "mill_shell_acoustic", "motor_accelerometer", "motor_temperature"]:
                 sensor_kwargs["output_path"] = output_path
                 if duration_seconds is not None:
                     sensor_kwargs["run_duration_seconds"] = duration_seconds
 
-            # For touchswitch_pulley: no arguments needed!
-
-            thread = threading.Thread(
-                target=config["function"],
-                kwargs=sensor_kwargs,
-                name=f"{sensor_type}_thread",
-                daemon=True
-            )
+            # Coroutine sensors share one event loop instead of a thread each
+            if inspect.iscoroutinefunction(config["function"]):
+                async_sensors.append((config["description"], config["function"], sensor_kwargs))
+                logger.info(f"🚀 Scheduled {config['description']} (Output: {output_path})")
+                continue
 
-            self.threads.append(thread)
-            thread.start()
+            self._start_thread(config["description"], config["function"], sensor_kwargs, f"{sensor_type}_thread")
             logger.info(f"🚀 Started {config['description']} (Output: {output_path if 'default_file' in config else 'N/A'})")
 
+        if async_sensors:
+            self._start_thread("async sensors", asyncio.run, {"main": self._gather_async_sensors(async_sensors)}, "async_sensors_thread")
+            logger.info(f"🚀 Started event loop for {len(async_sensors)} async sensors")
+
         try:
-            for thread in self.threads:
-                thread.join()
+            # Sleeps until the last sensor finishes (or the run duration is up), without polling
+            if not self._shutdown.wait(timeout=duration_seconds):
+                logger.info(f"⏱️ Run duration of {duration_seconds}s reached")
+            self.stop_all_sensors()
 
             logger.info("=" * 80)
-            logger.info("✅ ALL SENSORS COMPLETED SUCCESSFULLY!")
+            still_running = [thread.name for thread in self.threads if thread.is_alive()]
+            if self._failed:
+                logger.error(f"❌ {len(self._failed)} sensor(s) failed: {', '.join(self._failed)}")
+            if still_running:
+                logger.warning(f"⚠️ Sensors still running after shutdown timeout: {', '.join(still_running)}")
+            if not self._failed and not still_running:
+                logger.info("✅ ALL SENSORS COMPLETED SUCCESSFULLY!")
             logger.info("📁 Generated files:")
             for sensor_type, config in self.sensor_configs.items():
                 if "default_file" in config:
@@ -210,11 +229,55 @@ class MainDataGenerator:
 
         self.running = False
 
+    def _start_thread(self, description, function, kwargs, name):
+        with self._active_lock:
+            self._active_count += 1
+        thread = threading.Thread(target=self._run_sensor, args=(description, function, kwargs), name=name, daemon=True)
+        self.threads.append(thread)
+        thread.start()
+
+    def _run_sensor(self, description, function, kwargs):
+        try:
+            function(**kwargs)
+        except Exception as e:
+            logger.error(f"❌ {description} failed: {e}")
+            self._failed.append(description)
+        finally:
+            with self._active_lock:
+                self._active_count -= 1
+                if self._active_count == 0:
+                    self._shutdown.set()
+
+    async def _gather_async_sensors(self, sensors):
+        self._async_loop = asyncio.get_running_loop()
+        self._async_task = asyncio.current_task()
+        try:
+            await asyncio.gather(*(self._run_async_sensor(*sensor) for sensor in sensors))
+        except asyncio.CancelledError:
+            logger.info("⛔ Async sensors stopped")
+
+    async def _run_async_sensor(self, description, function, kwargs):
+        # A failing coroutine must not end the gather, which would cancel every other sensor on the loop
+        try:
+            await function(**kwargs)
+        except Exception as e:
+            logger.error(f"❌ {description} failed: {e}")
+            self._failed.append(description)
+
     def stop_all_sensors(self):
         logger.info("🛑 Stopping all sensor simulations...")
         self.running = False
+        self._shutdown.set()
+        # Cancelling lets the async sensors flush their files on the way out
+        if self._async_task is not None:
+            try:
+                self._async_loop.call_soon_threadsafe(self._async_task.cancel)
+            except RuntimeError:  # loop already finished
+                pass
+        # Blocking sensors can't be told to stop, so give them 5 s in total, not 5 s each
+        deadline = time.monotonic() + 5
         for thread in self.threads:
-            thread.join(timeout=5)
+            thread.join(timeout=max(0, deadline - time.monotonic()))
 
 def main():
     import argparse